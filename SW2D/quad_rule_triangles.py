@@ -326,3 +326,53 @@ def quad_rule_triangles( order ):
     py = 2.0*pnts.T[1]-1.0
     ww = 2.0 * weights
     return px, py, ww
+
+
+#########################################################################################
+# Precomputed, read-only registry of the rules above
+#########################################################################################
+
+from collections import namedtuple
+
+#   QuadRule:
+#       order:  number of quadrature points (the key used by quad_rule_triangles)
+#       degree: degree of precision, i.e. the highest total degree of the polynomials
+#               integrated exactly (measured, so orders 1 and 9 differ from the
+#               comments above)
+#       xy:     (2, N) C-contiguous array, xy[0] = px, xy[1] = py
+#       ww:     (N,) weights summing to 2, the area of the reference element
+#
+QuadRule = namedtuple( 'QuadRule', [ 'order', 'degree', 'xy', 'ww' ] )
+QuadRule.px = property( lambda self: self.xy[0] )
+QuadRule.py = property( lambda self: self.xy[1] )
+
+quad_rule_degrees = { 1: 1, 3: 2, 4: 3, 6: 4, 7: 5, 9: 5, 12: 6, 13: 7, 19: 9, 28: 11, 37: 13 }
+
+_quad_rules = {}
+
+def get_quad_rule( order ):
+#
+#   Returns the QuadRule for the given order, built on first use and shared afterwards.
+#   The arrays are flagged writeable=False, so they can be handed to element loops
+#   without copies and without the risk of being modified in place.
+#
+    rule = _quad_rules.get( order )
+    if rule is None:
+        px, py, ww = quad_rule_triangles( order )
+        xy = np.ascontiguousarray( np.vstack( ( px, py ) ) )
+        ww = np.ascontiguousarray( ww )
+        xy.flags.writeable = False
+        ww.flags.writeable = False
+        rule = QuadRule( order, quad_rule_degrees[ order ], xy, ww )
+        _quad_rules[ order ] = rule
+    return rule
+
+def quad_rule_for_degree( degree ):
+#
+#   Returns the cheapest QuadRule (fewest points) whose degree of precision is
+#   at least the requested polynomial degree.
+#
+    for order in sorted( quad_rule_degrees ):
+        if quad_rule_degrees[ order ] >= degree:
+            return get_quad_rule( order )
+    raise Exception( 'No quadrature rule reaches degree of precision %d!' % degree )
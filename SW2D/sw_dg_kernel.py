@@ -0,0 +1,167 @@
+import numpy as np
+
+from quad_rule_triangles import quad_rule_for_degree
+from tri_basis import eval_basis, tabulate_basis
+from tri_mesh_edges import MeshEdges, gauss_legendre, ref_edge_points
+from tri_mesh_geometry import MeshGeometry
+
+#########################################################################################
+# Modal DG discretization of the 2D shallow-water equations
+#
+#   U = ( h, hu, hv ),   dU/dt + d(Fx)/dx + d(Fy)/dy = 0
+#
+# The solution is stored as coefficients U[c, e, i] of the orthonormal Dubiner basis,
+# so the element mass matrices are |det J| times the identity and the semi-discrete
+# right-hand side needs no linear solve.
+#########################################################################################
+
+#~==============================================================================
+def physical_flux( U, g ):
+#
+#   Fx, Fy of the shallow-water equations for U of shape (3, ...).
+#
+    h, hu, hv = U
+    u = hu / h
+    v = hv / h
+    p = 0.5 * g * h * h
+    Fx = np.stack( ( hu, hu * u + p, hu * v ) )
+    Fy = np.stack( ( hv, hv * u, hv * v + p ) )
+    return Fx, Fy
+
+def _normal_flux( U, nx, ny, g ):
+    h, hu, hv = U
+    un = ( hu * nx + hv * ny ) / h
+    p = 0.5 * g * h * h
+    Fn = np.stack( ( h * un, hu * un + p * nx, hv * un + p * ny ) )
+    return Fn, un, np.sqrt( g * h )
+
+def rusanov_flux( UL, UR, nx, ny, g ):
+    FL, unL, cL = _normal_flux( UL, nx, ny, g )
+    FR, unR, cR = _normal_flux( UR, nx, ny, g )
+    smax = np.maximum( np.abs( unL ) + cL, np.abs( unR ) + cR )
+    return 0.5 * ( FL + FR ) - 0.5 * smax * ( UR - UL )
+
+def hll_flux( UL, UR, nx, ny, g ):
+    FL, unL, cL = _normal_flux( UL, nx, ny, g )
+    FR, unR, cR = _normal_flux( UR, nx, ny, g )
+    sL = np.minimum( unL - cL, unR - cR )
+    sR = np.maximum( unL + cL, unR + cR )
+    Fm = ( sR * FL - sL * FR + sL * sR * ( UR - UL ) ) / ( sR - sL )
+    return np.where( sL >= 0.0, FL, np.where( sR <= 0.0, FR, Fm ) )
+
+numerical_fluxes = { 'rusanov': rusanov_flux, 'hll': hll_flux }
+
+def wall_state( U, nx, ny ):
+#
+#   Ghost state of a reflective wall: same depth, mirrored normal velocity.
+#
+    h, hu, hv = U
+    qn = hu * nx + hv * ny
+    return np.stack( ( h, hu - 2.0 * qn * nx, hv - 2.0 * qn * ny ) )
+
+#~==============================================================================
+class SWDGKernel:
+    '''Semi-discrete DG operator of the shallow-water equations on a triangle mesh.
+
+    Parameters
+    ----------
+    nodes, elems : ndarray
+       (Nn, 2) coordinates and (E, 3) connectivity.
+    order : int, optional
+       Polynomial degree of the Dubiner basis; 0 gives the first-order finite
+       volume scheme.
+    g : float, optional
+       Gravitational acceleration.
+    flux : str, optional
+       Numerical flux, 'rusanov' or 'hll'.
+    quad_order : int, optional
+       Volume rule, by default the cheapest one exact for degree 2*order+1.
+    n_edge_pts : int, optional
+       Gauss-Legendre points per edge, by default order+1.
+
+    Everything that depends only on the mesh (basis tables, physical gradients
+    times quadrature weights, edge traces, normals) is precomputed, so ``rhs`` is
+    a fixed sequence of array operations over all elements and edges. Boundary
+    edges are reflective walls.
+    '''
+
+    def __init__( self, nodes, elems, order=1, g=9.81, flux='rusanov', quad_order=None, n_edge_pts=None ):
+        if quad_order is None:
+            quad_order = quad_rule_for_degree( 2*order + 1 ).order
+        if n_edge_pts is None:
+            n_edge_pts = max( order + 1, 1 )
+
+        self.g = g
+        self.order = order
+        self.flux = numerical_fluxes[ flux ]
+
+        # volume terms
+        self.table = tabulate_basis( 'dubiner', order, quad_order )
+        self.geom  = MeshGeometry( nodes, elems, quad_order )
+        self.absdetJ = np.abs( self.geom.detJ )
+        dphi = np.einsum( 'ekd,kiq->ediq', self.geom.invJ, self.table.grads )
+        self.wgrad = dphi * self.geom.wdetJ[:,None,None,:]
+
+        # edge terms
+        t, _ = gauss_legendre( n_edge_pts )
+        self.edges = MeshEdges( elems )
+        self.trace = np.stack( [ eval_basis( 'dubiner', order, *ref_edge_points( k, t ) )[0]
+                                 for k in range( 3 ) ] )                  # (3, nb, nqe)
+        _, self.wedge, L = self.edges.quadrature( nodes, n_edge_pts )     # (Ned, nqe)
+
+        ed = self.edges
+        d = nodes[ ed.nodes[:,1] ] - nodes[ ed.nodes[:,0] ]
+        sgn = np.sign( self.geom.detJ[ ed.left ] )
+        self.nx = (  d[:,1] / L * sgn )[:,None]
+        self.ny = ( -d[:,0] / L * sgn )[:,None]
+        self.elem_sign = np.where( ed.elem_side == 0, -1.0, 1.0 )[:,:,None,None]
+
+    def project( self, func ):
+#
+#       L2 projection of func( x, y ) -> (3, E, nq) onto the basis.
+#
+        xq = self.geom.xq
+        fq = np.asarray( func( xq[...,0], xq[...,1] ) )
+        return np.einsum( 'ceq,iq,q->cei', fq, self.table.values, self.table.rule.ww )
+
+    def evaluate( self, U ):
+        return np.einsum( 'cei,iq->ceq', U, self.table.values )
+
+    def rhs( self, U ):
+#
+#       U: (3, E, nb) coefficients.  Returns dU/dt with the same shape.
+#
+        ed = self.edges
+
+        # volume integral  int F . grad(phi_i) dx
+        Fx, Fy = physical_flux( self.evaluate( U ), self.g )
+        vol = np.einsum( 'ceq,eiq->cei', Fx, self.wgrad[:,0] ) \
+            + np.einsum( 'ceq,eiq->cei', Fy, self.wgrad[:,1] )
+
+        # traces on both sides of every edge, in the left element orientation
+        Ue = np.einsum( 'cei,kiq->ekqc', U, self.trace )
+        UL, UR = ( np.moveaxis( v, -1, 0 ) for v in ed.traces( Ue ) )
+        UR = np.where( ed.boundary[None,:,None], wall_state( UL, self.nx, self.ny ), UR )
+
+        # - oint Fhat.n phi_i ds, with opposite signs for the left and right elements
+        Fn = self.flux( UL, UR, self.nx, self.ny, self.g ) * self.wedge
+        Fe = ed.to_elements( np.moveaxis( Fn, 0, -1 ) ) * self.elem_sign   # (E, 3, nqe, 3)
+        surf = np.einsum( 'ekqc,kiq->cei', Fe, self.trace )
+
+        return ( vol + surf ) / self.absdetJ[None,:,None]
+
+    def max_dt( self, U, cfl=0.5 ):
+#
+#       Explicit time step from the element inradius and the maximum wave speed.
+#
+        h, hu, hv = self.evaluate( U )
+        s = ( np.hypot( hu, hv ) / h + np.sqrt( self.g * h ) ).max( axis=1 )
+        xe = self.geom.nodes[ self.geom.elems ]
+        perim = np.linalg.norm( xe - np.roll( xe, 1, axis=1 ), axis=2 ).sum( axis=1 )
+        inradius = 4.0 * self.absdetJ / perim                          # area = 2 |det J|
+        return cfl * ( inradius / s ).min() / ( 2*self.order + 1 )
+
+    def ssp_rk3_step( self, U, dt ):
+        U1 = U + dt * self.rhs( U )
+        U2 = 0.75 * U + 0.25 * ( U1 + dt * self.rhs( U1 ) )
+        return U / 3.0 + 2.0 / 3.0 * ( U2 + dt * self.rhs( U2 ) )
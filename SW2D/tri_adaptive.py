@@ -0,0 +1,113 @@
+import numpy as np
+
+from quad_rule_triangles import get_quad_rule
+from tri_mesh_integration import ref_shape_functions
+
+#########################################################################################
+# Adaptive integration over triangles
+#
+# The error of every triangle is estimated by the difference between two rules of
+# different order. While the summed error exceeds the tolerance, the fewest leaves
+# of the partition, largest errors first, whose errors cover the excess are split
+# in four through the edge midpoints, and all their children are evaluated as one
+# batch, level by level, instead of recursing per triangle.
+#########################################################################################
+
+def _rule_integrals( verts, func, rule, N ):
+    xq = np.einsum( 'qk,ekd->eqd', N, verts )
+    d1 = verts[:,1] - verts[:,0]
+    d2 = verts[:,2] - verts[:,0]
+    detJ = 0.25 * np.abs( d1[:,0] * d2[:,1] - d1[:,1] * d2[:,0] )
+    fq = np.asarray( func( xq[...,0], xq[...,1] ) )
+    return np.einsum( 'eq,q,e->e', fq, rule.ww, detJ ), 2.0 * detJ
+
+def _split( verts ):
+    v0, v1, v2 = verts[:,0], verts[:,1], verts[:,2]
+    m01 = 0.5 * ( v0 + v1 )
+    m12 = 0.5 * ( v1 + v2 )
+    m20 = 0.5 * ( v2 + v0 )
+    return np.concatenate( ( np.stack( ( v0,  m01, m20 ), axis=1 ),
+                             np.stack( ( m01, v1,  m12 ), axis=1 ),
+                             np.stack( ( m20, m12, v2  ), axis=1 ),
+                             np.stack( ( m01, m12, m20 ), axis=1 ) ) )
+
+def integrate_adaptive( verts, func, tol=1e-8, low_order=13, high_order=28,
+                        max_levels=40, max_active=1000000, uniform_order=37 ):
+#
+#   verts:
+#       (T, 3, 2) triangle vertices, e.g. nodes[ elems ].
+#   func:
+#       Vectorized integrand func( x, y ) of (n, nq) arrays.
+#   tol:
+#       Absolute tolerance on the sum of the estimated errors of all triangles.
+#   low_order / high_order:
+#       quad_rule_triangles orders of the estimator pair; the result uses the
+#       high order rule. The 19 point rule is tabulated with ~1e-9 accuracy only,
+#       so it makes a poor estimator for tight tolerances.
+#   max_levels / max_active:
+#       Maximum number of refinement passes and of triangles in one batch; the
+#       partition reached when either limit stops the refinement is returned
+#       and reported as not converged.
+#   uniform_order:
+#       Rule used as reference for the function evaluation count.
+#
+#   Returns ( elem_integrals, total, info ), where elem_integrals are the (T,)
+#   integrals over the input triangles and info is a dict with
+#       n_evals:         integrand evaluations used
+#       n_evals_uniform: evaluations of uniform_order on the input triangles
+#       n_leaves:        number of triangles of the final partition
+#       error:           sum of the estimated errors
+#       converged:       whether the summed error met tol
+#
+    lo = get_quad_rule( low_order )
+    hi = get_quad_rule( high_order )
+    N_lo = ref_shape_functions( lo.px, lo.py )
+    N_hi = ref_shape_functions( hi.px, hi.py )
+
+    verts = np.asarray( verts, dtype=float )
+    n_tris = verts.shape[0]
+
+    # Current partition: vertices, input triangle, integral and error of every leaf
+    leaves = verts
+    owner  = np.arange( n_tris )
+    I, err = np.zeros( 0 ), np.zeros( 0 )
+    new    = leaves
+    n_evals = 0
+    converged = False
+
+    for level in range( max_levels + 1 ):
+        I_lo, _    = _rule_integrals( new, func, lo, N_lo )
+        I_hi, _    = _rule_integrals( new, func, hi, N_hi )
+        n_evals += new.shape[0] * ( lo.ww.size + hi.ww.size )
+        I   = np.concatenate( ( I, I_hi ) )
+        err = np.concatenate( ( err, np.abs( I_hi - I_lo ) ) )
+
+        excess = err.sum() - tol
+        if excess <= 0:
+            converged = True
+            break
+
+        # Split the fewest leaves, largest errors first, whose errors cover the excess
+        order = np.argsort( err )[::-1]
+        n_split = int( np.searchsorted( np.cumsum( err[order] ), excess ) ) + 1
+        if level == max_levels or 4 * n_split > max_active:
+            break
+        split = np.zeros( err.size, dtype=bool )
+        split[ order[:n_split] ] = True
+
+        new    = _split( leaves[split] )
+        leaves = np.concatenate( ( leaves[~split], new ) )
+        owner  = np.concatenate( ( owner[~split], np.tile( owner[split], 4 ) ) )
+        I, err = I[~split], err[~split]
+
+    elem_integrals = np.bincount( owner, weights=I, minlength=n_tris ).astype( float )
+    n_leaves = leaves.shape[0]
+    error = err.sum()
+
+    info = { 'n_evals':         n_evals,
+             'n_evals_uniform': n_tris * get_quad_rule( uniform_order ).ww.size,
+             'n_leaves':        n_leaves,
+             'error':           error,
+             'converged':       converged }
+
+    return elem_integrals, elem_integrals.sum(), info
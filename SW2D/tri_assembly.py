@@ -0,0 +1,145 @@
+import numpy as np
+from lazy_import import LazyModule
+
+from quad_rule_triangles import quad_rule_for_degree
+from tri_basis import tabulate_basis
+from tri_mesh_geometry import MeshGeometry
+
+sps = LazyModule( 'scipy.sparse' )
+
+#########################################################################################
+# Batched assembly of sparse FEM/DG matrices on triangle meshes
+#########################################################################################
+
+class SparsityPattern:
+    '''CSR sparsity of a global matrix built from (E, nb, nb) element matrices.
+
+    Parameters
+    ----------
+    dofs : ndarray
+       (E, nb) global degree of freedom numbers of each element.
+    n_dofs : int, optional
+       Size of the global matrix, max(dofs)+1 by default.
+
+    The mapping from every local entry to its slot in the CSR data array is
+    computed once, so assembling new values is a single bincount.
+    '''
+
+    def __init__( self, dofs, n_dofs=None ):
+        dofs = np.asarray( dofs )
+        n_elems, nb = dofs.shape
+        if n_dofs is None:
+            n_dofs = int( dofs.max() ) + 1
+
+        rows = np.broadcast_to( dofs[:,:,None], ( n_elems, nb, nb ) ).ravel()
+        cols = np.broadcast_to( dofs[:,None,:], ( n_elems, nb, nb ) ).ravel()
+        keys = rows.astype( np.int64 ) * n_dofs + cols
+
+        ukeys, self.slot = np.unique( keys, return_inverse=True )
+        self.slot    = self.slot.ravel()
+        self.indices = ( ukeys % n_dofs ).astype( np.int32 )
+        self.indptr  = np.zeros( n_dofs + 1, dtype=np.int32 )
+        np.cumsum( np.bincount( ukeys // n_dofs, minlength=n_dofs ), out=self.indptr[1:] )
+
+        self.dofs   = dofs
+        self.n_dofs = n_dofs
+        self.nnz    = ukeys.size
+
+    def values( self, local ):
+        return np.bincount( self.slot, weights=np.asarray( local ).ravel(), minlength=self.nnz )
+
+    def assemble( self, local ):
+#
+#       Builds a new CSR matrix from the (E, nb, nb) element matrices.
+#
+        return sps.csr_matrix( ( self.values( local ), self.indices.copy(), self.indptr.copy() ),
+                               shape=( self.n_dofs, self.n_dofs ) )
+
+    def update( self, A, local ):
+#
+#       Overwrites the values of a matrix returned by assemble, keeping its
+#       structure, e.g. when the coefficients change between time steps.
+#
+        A.data[:] = self.values( local )
+        return A
+
+#~==============================================================================
+def _coeff_weights( geom, coeff ):
+#
+#   Quadrature weights times |det J| times the coefficient, as an (E, nq) array.
+#   coeff can be None, a scalar, an (E,) array or an (E, nq) array.
+#
+    w = geom.wdetJ
+    if coeff is None:
+        return w
+    coeff = np.asarray( coeff )
+    if coeff.ndim == 1:
+        coeff = coeff[:,None]
+    return w * coeff
+
+def local_mass( geom, table, coeff=None ):
+#
+#   (E, nb, nb) element mass matrices  int c phi_i phi_j dx.
+#
+    phi = table.values
+    return np.einsum( 'iq,jq,eq->eij', phi, phi, _coeff_weights( geom, coeff ), optimize=True )
+
+def local_stiffness( geom, table, coeff=None ):
+#
+#   (E, nb, nb) element stiffness matrices  int c grad(phi_i) . grad(phi_j) dx,
+#   with grad = J^-T grad_ref, so that the metric  invJ invJ^T  is contracted
+#   with the reference gradient tables without forming physical gradients.
+#
+    g = table.grads
+    G = np.einsum( 'ekd,eld->ekl', geom.invJ, geom.invJ )
+    return np.einsum( 'kiq,ljq,ekl,eq->eij', g, g, G, _coeff_weights( geom, coeff ), optimize=True )
+
+#~==============================================================================
+def dg_dofs( n_elems, nb ):
+#
+#   Element-wise (discontinuous) numbering of the degrees of freedom.
+#
+    return np.arange( n_elems * nb ).reshape( n_elems, nb )
+
+
+class TriAssembler:
+    '''Assembles global mass and stiffness matrices for one mesh and basis.
+
+    Parameters
+    ----------
+    nodes, elems : ndarray
+       (Nn, 2) coordinates and (E, 3) connectivity.
+    kind : str, optional
+       'lagrange' or 'dubiner' (see tri_basis).
+    order : int, optional
+       Polynomial degree of the basis.
+    quad_order : int, optional
+       Order of the quadrature rule, by default the cheapest rule that
+       integrates the mass matrix exactly.
+    dofs : ndarray, optional
+       (E, nb) global numbering. Defaults to the connectivity for P1 Lagrange
+       and to dg_dofs for the Dubiner basis; it is required for Pk Lagrange.
+    '''
+
+    def __init__( self, nodes, elems, kind='lagrange', order=1, quad_order=None, dofs=None ):
+        if quad_order is None:
+            quad_order = quad_rule_for_degree( 2*order ).order
+        self.table = tabulate_basis( kind, order, quad_order )
+        self.geom  = MeshGeometry( nodes, elems, quad_order )
+
+        if dofs is None:
+            if kind == 'dubiner':
+                dofs = dg_dofs( elems.shape[0], self.table.values.shape[0] )
+            elif order == 1:
+                dofs = elems
+            else:
+                raise Exception( 'A dof numbering is required for Lagrange order %d!' % order )
+        self.pattern = SparsityPattern( dofs )
+
+    def mass( self, coeff=None, A=None ):
+        local = local_mass( self.geom, self.table, coeff )
+        return self.pattern.assemble( local ) if A is None else self.pattern.update( A, local )
+
+    def stiffness( self, coeff=None, A=None ):
+        local = local_stiffness( self.geom, self.table, coeff )
+        return self.pattern.assemble( local ) if A is None else self.pattern.update( A, local )
@@ -0,0 +1,157 @@
+import numpy as np
+from math import gamma
+from collections import namedtuple
+from functools import lru_cache
+
+from quad_rule_triangles import get_quad_rule
+
+#########################################################################################
+# Basis functions on the reference triangle (-1,-1), (+1,-1), (-1,+1)
+#
+# Adapted from:
+# J.S. Hesthaven, T. Warburton, Nodal Discontinuous Galerkin Methods, Springer, 2008.
+#########################################################################################
+
+def jacobi_p( x, alpha, beta, N ):
+#
+#   Orthonormal Jacobi polynomial P_N^(alpha,beta)(x) on [-1,1].
+#
+    x = np.asarray( x, dtype=float )
+    PL = np.zeros( ( N+1, ) + x.shape )
+
+    gamma0 = 2.0**(alpha+beta+1) / (alpha+beta+1) \
+           * gamma(alpha+1) * gamma(beta+1) / gamma(alpha+beta+1)
+    PL[0] = 1.0 / np.sqrt( gamma0 )
+    if N == 0:
+        return PL[0]
+
+    gamma1 = (alpha+1) * (beta+1) / (alpha+beta+3) * gamma0
+    PL[1] = ( (alpha+beta+2) * x / 2 + (alpha-beta) / 2 ) / np.sqrt( gamma1 )
+    if N == 1:
+        return PL[1]
+
+    aold = 2 / (2+alpha+beta) * np.sqrt( (alpha+1) * (beta+1) / (alpha+beta+3) )
+    for i in range( 1, N ):
+        h1 = 2*i + alpha + beta
+        anew = 2 / (h1+2) * np.sqrt( (i+1) * (i+1+alpha+beta) * (i+1+alpha) * (i+1+beta)
+                                     / (h1+1) / (h1+3) )
+        bnew = - (alpha**2 - beta**2) / h1 / (h1+2)
+        PL[i+1] = 1 / anew * ( -aold * PL[i-1] + (x - bnew) * PL[i] )
+        aold = anew
+    return PL[N]
+
+def grad_jacobi_p( x, alpha, beta, N ):
+    if N == 0:
+        return np.zeros_like( np.asarray( x, dtype=float ) )
+    return np.sqrt( N * (N+alpha+beta+1) ) * jacobi_p( x, alpha+1, beta+1, N-1 )
+
+def rs_to_ab( r, s ):
+#
+#   Collapsed coordinates of the reference triangle.
+#
+    r = np.asarray( r, dtype=float )
+    s = np.asarray( s, dtype=float )
+    a = np.full_like( r, -1.0 )
+    m = s != 1.0
+    a[m] = 2.0 * ( 1.0 + r[m] ) / ( 1.0 - s[m] ) - 1.0
+    return a, s
+
+#~==============================================================================
+def dubiner_indices( order ):
+    return [ ( i, j ) for i in range( order+1 ) for j in range( order+1-i ) ]
+
+def dubiner( order, r, s ):
+#
+#   Orthonormal Dubiner basis of total degree <= order at the points (r, s).
+#
+#   Returns ( values, grads ) with shapes (nbasis, nq) and (2, nbasis, nq), where
+#   grads[0] = d/dr and grads[1] = d/ds.
+#
+    a, b = rs_to_ab( r, s )
+    idx = dubiner_indices( order )
+    values = np.empty( ( len( idx ), ) + a.shape )
+    grads  = np.empty( ( 2, len( idx ) ) + a.shape )
+
+    for ( n, ( i, j ) ) in enumerate( idx ):
+        fa  = jacobi_p( a, 0, 0, i )
+        dfa = grad_jacobi_p( a, 0, 0, i )
+        gb  = jacobi_p( b, 2*i+1, 0, j )
+        dgb = grad_jacobi_p( b, 2*i+1, 0, j )
+
+        values[n] = np.sqrt( 2.0 ) * fa * gb * ( 1.0 - b )**i
+
+        # r-derivative
+        dmodedr = dfa * gb
+        if i > 0:
+            dmodedr = dmodedr * ( 0.5 * ( 1.0 - b ) )**(i-1)
+
+        # s-derivative
+        dmodeds = dfa * ( gb * ( 0.5 * ( 1.0 + a ) ) )
+        if i > 0:
+            dmodeds = dmodeds * ( 0.5 * ( 1.0 - b ) )**(i-1)
+        tmp = dgb * ( 0.5 * ( 1.0 - b ) )**i
+        if i > 0:
+            tmp = tmp - 0.5 * i * gb * ( 0.5 * ( 1.0 - b ) )**(i-1)
+        dmodeds = dmodeds + fa * tmp
+
+        grads[0,n] = 2.0**(i+0.5) * dmodedr
+        grads[1,n] = 2.0**(i+0.5) * dmodeds
+
+    return values, grads
+
+#~==============================================================================
+def lagrange_nodes( order ):
+#
+#   Equispaced Lagrange nodes of degree order. For order = 1 these are the
+#   vertices in connectivity order: (-1,-1), (+1,-1), (-1,+1).
+#
+    r, s = [], []
+    for j in range( order+1 ):
+        for i in range( order+1-j ):
+            r.append( -1.0 + 2.0 * i / order )
+            s.append( -1.0 + 2.0 * j / order )
+    return np.array( r ), np.array( s )
+
+def lagrange( order, r, s ):
+#
+#   Lagrange basis of degree order, built from the Dubiner basis through the
+#   inverse of its Vandermonde matrix at the lagrange_nodes.
+#
+    V, _ = dubiner( order, *lagrange_nodes( order ) )
+    C = np.linalg.inv( V )          # V[m,n] = psi_m(node_n)  =>  l = V^-1 psi
+    values, grads = dubiner( order, r, s )
+    return C @ values, np.einsum( 'nm,dm...->dn...', C, grads )
+
+#~==============================================================================
+_basis_functions = { 'lagrange': lagrange, 'dubiner': dubiner }
+
+BasisTable = namedtuple( 'BasisTable', [ 'values', 'grads', 'rule' ] )
+
+def eval_basis( kind, order, r, s ):
+    if kind not in _basis_functions:
+        raise Exception( 'Unknown basis type %s!' % kind )
+    return _basis_functions[ kind ]( order, np.asarray( r, dtype=float ), np.asarray( s, dtype=float ) )
+
+@lru_cache( maxsize=None )
+def tabulate_basis( kind, order, quad_order ):
+#
+#   kind:
+#       'lagrange' (P1-Pk equispaced nodal) or 'dubiner' (orthonormal modal).
+#   order:
+#       Polynomial degree k of the basis.
+#   quad_order:
+#       Order of the quad_rule_triangles rule.
+#
+#   Returns a BasisTable with read-only arrays
+#       values: (nbasis, nq)     basis values at the quadrature points
+#       grads:  (2, nbasis, nq)  reference gradients (d/dxi, d/deta)
+#       rule:   the QuadRule the tables were built for
+#   memoized per (kind, order, quad_order).
+#
+    rule = get_quad_rule( quad_order )
+    values, grads = eval_basis( kind, order, rule.px, rule.py )
+    values = np.ascontiguousarray( values )
+    grads  = np.ascontiguousarray( grads )
+    values.flags.writeable = False
+    grads.flags.writeable  = False
+    return BasisTable( values, grads, rule )
@@ -0,0 +1,138 @@
+import numpy as np
+from functools import lru_cache
+
+#########################################################################################
+# Edge (face) index of a triangle mesh and 1D quadrature on its edges
+#
+# Local edge k of an element goes from its vertex k to vertex k+1, i.e. on the
+# reference element (-1,-1) -> (+1,-1) -> (-1,+1) -> (-1,-1).
+#########################################################################################
+
+@lru_cache( maxsize=None )
+def gauss_legendre( n_pts, dps=32 ):
+#
+#   Gauss-Legendre points and weights on [-1,1] from mp_GaussLegendre, computed in
+#   arbitrary precision once per number of points and rounded to float64.
+#
+    if n_pts == 1:
+        # Midpoint rule; GaussLegendre_PW needs a Jacobi matrix of size >= 2
+        t, wt = np.array( [ 0.0 ] ), np.array( [ 2.0 ] )
+    else:
+        import mpmath
+        from mp_GaussLegendre import GaussLegendre_PW
+
+        with mpmath.workdps( dps ):
+            x, w = GaussLegendre_PW( mpmath, n_pts )
+        t  = np.array( [ float( v ) for v in x ] )
+        wt = np.array( [ float( v ) for v in w ] )
+    t.flags.writeable  = False
+    wt.flags.writeable = False
+    return t, wt
+
+def ref_edge_points( k, t ):
+#
+#   Reference coordinates of the points t in [-1,1] on local edge k.
+#
+    t = np.asarray( t, dtype=float )
+    if k == 0:
+        return t, -np.ones_like( t )
+    if k == 1:
+        return -t, t
+    return -np.ones_like( t ), -t
+
+
+class MeshEdges:
+    '''Edge index of a triangle mesh, built once with a vectorized sort.
+
+    Parameters
+    ----------
+    elems : ndarray
+       (E, 3) connectivity.
+
+    Attributes (Ned = number of unique edges)
+    ----------
+    nodes : (Ned, 2) end nodes in the orientation of the left element
+    left, right : (Ned,) elements on each side, right = -1 on the boundary
+    left_local, right_local : (Ned,) local edge numbers (right_local = 0 on the boundary)
+    flip : (Ned,) True where the right element runs the edge in the opposite direction
+    boundary : (Ned,) True for boundary edges
+    elem_edges : (E, 3) global edge of every local edge
+    elem_side : (E, 3) 0 if the element is the left one of that edge, 1 if right
+    '''
+
+    def __init__( self, elems ):
+        n_elems = elems.shape[0]
+        a = elems[:, [0,1,2]].ravel()
+        b = elems[:, [1,2,0]].ravel()
+        keys = np.minimum( a, b ).astype( np.int64 ) * ( int( elems.max() ) + 1 ) + np.maximum( a, b )
+
+        _, inv, counts = np.unique( keys, return_inverse=True, return_counts=True )
+        inv = inv.ravel()
+        if counts.max() > 2:
+            raise Exception( 'Non-manifold mesh: edge shared by more than 2 elements!' )
+
+        order = np.argsort( inv, kind='stable' )
+        first = np.concatenate( ( [0], np.cumsum( counts )[:-1] ) )
+        half_L = order[ first ]
+        half_R = np.where( counts == 2, order[ np.minimum( first + 1, order.size - 1 ) ], -1 )
+        has_R  = half_R >= 0
+
+        side = np.zeros( 3 * n_elems, dtype=np.int8 )
+        side[ half_R[ has_R ] ] = 1
+
+        self.nodes       = np.stack( ( a[ half_L ], b[ half_L ] ), axis=1 )
+        self.left        = half_L // 3
+        self.left_local  = half_L % 3
+        self.right       = np.where( has_R, half_R // 3, -1 )
+        self.right_local = np.where( has_R, half_R % 3, 0 )
+        self.flip        = has_R & ( a[ np.maximum( half_R, 0 ) ] != a[ half_L ] )
+        self.boundary    = ~has_R
+        self.elem_edges  = inv.reshape( n_elems, 3 )
+        self.elem_side   = side.reshape( n_elems, 3 )
+
+    def __len__( self ):
+        return self.nodes.shape[0]
+
+    def _point_index( self, n_pts ):
+        q = np.arange( n_pts )
+        q_R = np.where( self.flip[:,None], q[::-1], q )                          # (Ned, nq)
+        rev = ( self.elem_side == 1 ) & self.flip[ self.elem_edges ]
+        q_E = np.where( rev[:,:,None], q[::-1], q )                              # (E, 3, nq)
+        return q_R, q_E
+
+    def traces( self, elem_vals ):
+#
+#       elem_vals: (E, 3, nq, ...) values at the edge points of every local edge,
+#                  in the local edge orientation.
+#       Returns the (Ned, nq, ...) left and right traces, both in the orientation
+#       of the left element. The right trace is the left one on boundary edges.
+#
+        n_pts = elem_vals.shape[2]
+        q_R, _ = self._point_index( n_pts )
+        R = np.where( self.boundary, self.left, self.right )
+        k = np.where( self.boundary, self.left_local, self.right_local )
+        q_R = np.where( self.boundary[:,None], np.arange( n_pts ), q_R )
+        val_L = elem_vals[ self.left, self.left_local ]
+        val_R = elem_vals[ R[:,None], k[:,None], q_R ]
+        return val_L, val_R
+
+    def to_elements( self, edge_vals ):
+#
+#       Inverse of traces: edge_vals (Ned, nq, ...) in the left orientation are
+#       returned as (E, 3, nq, ...) in the local orientation of every element.
+#
+        _, q_E = self._point_index( edge_vals.shape[1] )
+        return edge_vals[ self.elem_edges[:,:,None], q_E ]
+
+    def quadrature( self, nodes, n_pts ):
+#
+#       Gauss-Legendre rule mapped to every edge, in the left orientation.
+#       Returns the (Ned, nq, 2) physical points, the (Ned, nq) weights (which
+#       include the length Jacobian L/2) and the (Ned,) lengths.
+#
+        t, wt = gauss_legendre( n_pts )
+        xa = nodes[ self.nodes[:,0] ]
+        xb = nodes[ self.nodes[:,1] ]
+        L = np.linalg.norm( xb - xa, axis=1 )
+        xq = 0.5 * ( ( 1.0 - t )[None,:,None] * xa[:,None,:] + ( 1.0 + t )[None,:,None] * xb[:,None,:] )
+        return xq, 0.5 * L[:,None] * wt[None,:], L
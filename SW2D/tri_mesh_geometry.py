@@ -0,0 +1,126 @@
+import hashlib
+import numpy as np
+
+import h5_tools
+from quad_rule_triangles import get_quad_rule
+from tri_mesh_integration import element_jacobians, map_quad_points
+
+#########################################################################################
+# Per-mesh cache of the element geometry at the quadrature points
+#########################################################################################
+
+def mesh_fingerprint( nodes, elems, order ):
+#
+#   SHA1 of the node coordinates, the connectivity and the rule order, used to
+#   detect when the cached geometry is stale.
+#
+    h = hashlib.sha1()
+    h.update( repr( ( np.shape( nodes ), np.shape( elems ), int( order ) ) ).encode() )
+    h.update( np.ascontiguousarray( nodes, dtype=float ).data )
+    h.update( np.ascontiguousarray( elems, dtype=np.int64 ).data )
+    return h.hexdigest()
+
+
+class MeshGeometry:
+    '''Element geometry of a triangle mesh for one quadrature rule.
+
+    Parameters
+    ----------
+    nodes : ndarray
+       (Nn, 2) node coordinates.
+    elems : ndarray
+       (E, 3) connectivity.
+    order : int, optional
+       Order of the quad_rule_triangles rule.
+    dtype : numpy dtype, optional
+       Storage type of the cached arrays, e.g. np.float32 to halve the memory.
+
+    The arrays are computed on first access and kept until the node
+    coordinates change (see ``update``):
+
+    J     : (E, 2, 2) Jacobians d(x,y)/d(xi,eta), constant per element
+    invJ  : (E, 2, 2) inverse Jacobians
+    detJ  : (E,) determinants
+    xq    : (E, nq, 2) physical coordinates of the quadrature points
+    wdetJ : (E, nq) quadrature weights times |det J|
+    '''
+
+    _fields = ( 'J', 'invJ', 'detJ', 'xq', 'wdetJ' )
+
+    def __init__( self, nodes, elems, order=7, dtype=np.float64 ):
+        self.nodes = nodes
+        self.elems = elems
+        self.rule  = get_quad_rule( order )
+        self.dtype = np.dtype( dtype )
+        self._data = None
+        self._fingerprint = None
+
+    def __getattr__( self, name ):
+        if name in MeshGeometry._fields:
+            self._ensure()
+            return self._data[ name ]
+        raise AttributeError( name )
+
+    def _ensure( self ):
+        if self._data is not None:
+            return
+        J, detJ = element_jacobians( self.nodes, self.elems )
+        invJ = np.empty_like( J )
+        invJ[:,0,0] =  J[:,1,1] / detJ
+        invJ[:,0,1] = -J[:,0,1] / detJ
+        invJ[:,1,0] = -J[:,1,0] / detJ
+        invJ[:,1,1] =  J[:,0,0] / detJ
+        xq = map_quad_points( self.nodes, self.elems, self.rule )
+        wdetJ = np.abs( detJ )[:,None] * self.rule.ww[None,:]
+
+        self._data = { k: np.ascontiguousarray( v, dtype=self.dtype )
+                       for ( k, v ) in zip( MeshGeometry._fields, ( J, invJ, detJ, xq, wdetJ ) ) }
+        self._fingerprint = mesh_fingerprint( self.nodes, self.elems, self.rule.order )
+
+    def invalidate( self ):
+        self._data = None
+        self._fingerprint = None
+
+    def update( self, nodes=None ):
+#
+#       Points the geometry to new node coordinates (or re-checks the current
+#       array if it was modified in place). The cache is dropped only if the
+#       coordinates actually changed. Returns True if it was invalidated.
+#
+        if nodes is not None:
+            self.nodes = nodes
+        if self._data is None:
+            return False
+        if mesh_fingerprint( self.nodes, self.elems, self.rule.order ) == self._fingerprint:
+            return False
+        self.invalidate()
+        return True
+
+    #~==========================================================================
+    def save( self, hdf5_Output, group ):
+        self._ensure()
+        for k in MeshGeometry._fields:
+            h5_tools.save_hdf_array( hdf5_Output, group, k, self._data[ k ] )
+        h5_tools.save_hdf_scalar( hdf5_Output, group, 'order', self.rule.order )
+        h5_tools.save_hdf_string( hdf5_Output, group, 'fingerprint', self._fingerprint )
+
+    @classmethod
+    def load( cls, hdf5_Input, group, nodes, elems ):
+#
+#       Rebuilds a MeshGeometry from a file written by save. The stored arrays
+#       are used only if they were computed from the same node coordinates,
+#       connectivity and rule order, otherwise the geometry is recomputed on
+#       first access.
+#
+        order = int( h5_tools.load_hdf_scalar( hdf5_Input, group, 'order' ) )
+        fingerprint = h5_tools.load_hdf_string( hdf5_Input, group, 'fingerprint' )
+        if isinstance( fingerprint, bytes ):
+            fingerprint = fingerprint.decode( 'utf-8' )
+
+        dtype = hdf5_Input[ group + 'J' ].dtype
+        geom = cls( nodes, elems, order, dtype )
+        if fingerprint == mesh_fingerprint( nodes, elems, order ):
+            geom._data = { k: h5_tools.load_hdf_array( hdf5_Input, group, k )
+                           for k in MeshGeometry._fields }
+            geom._fingerprint = fingerprint
+        return geom
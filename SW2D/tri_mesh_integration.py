@@ -0,0 +1,89 @@
+import numpy as np
+
+from quad_rule_triangles import get_quad_rule, quad_rule_for_degree
+
+#########################################################################################
+# Mesh-wide integration over triangles
+#
+# The reference element is the one used by quad_rule_triangles:
+#   (-1,-1), (+1,-1), (-1,+1)  =>  Area = 2
+# with the affine map
+#   x = x0 * N0 + x1 * N1 + x2 * N2,
+#   N0 = -(xi+eta)/2,  N1 = (1+xi)/2,  N2 = (1+eta)/2
+#########################################################################################
+
+def ref_shape_functions( px, py ):
+#
+#   Linear shape functions of the affine map evaluated at the reference points.
+#   Returns an (N, 3) array.
+#
+    return np.stack( ( -0.5*( px + py ), 0.5*( 1.0 + px ), 0.5*( 1.0 + py ) ), axis=-1 )
+
+def element_jacobians( nodes, elems ):
+#
+#   nodes:
+#       (Nn, 2) array of node coordinates.
+#   elems:
+#       (E, 3) integer connectivity array.
+#
+#   Returns the (E, 2, 2) Jacobians J[e] = d(x,y)/d(xi,eta) and their (E,)
+#   determinants, which are constant per element for the affine map.
+#
+    x0 = nodes[ elems[:,0] ]
+    J = 0.5 * np.stack( ( nodes[ elems[:,1] ] - x0,
+                          nodes[ elems[:,2] ] - x0 ), axis=-1 )
+    detJ = J[:,0,0] * J[:,1,1] - J[:,0,1] * J[:,1,0]
+    return J, detJ
+
+def map_quad_points( nodes, elems, rule ):
+#
+#   Physical coordinates of all quadrature points of all elements.
+#   Returns an (E, N, 2) array.
+#
+    N = ref_shape_functions( rule.px, rule.py )
+    return np.einsum( 'qk,ekd->eqd', N, nodes[ elems ] )
+
+def _get_rule( order, degree ):
+    if degree is not None:
+        return quad_rule_for_degree( degree )
+    return get_quad_rule( order )
+
+def integrate_mesh( nodes, elems, func, order=7, degree=None, chunk_size=65536 ):
+#
+#   Integrates func over every triangle of the mesh.
+#
+#   func:
+#       Vectorized integrand func( x, y ), called with (chunk, N) arrays of the
+#       physical quadrature coordinates. It returns an array of shape (chunk, N)
+#       or (chunk, N, ...) for vector/tensor valued integrands.
+#   order / degree:
+#       Quadrature rule, chosen by order (number of points) or, if degree is given,
+#       by the cheapest rule reaching that degree of precision.
+#   chunk_size:
+#       Number of elements processed per pass, which bounds the peak memory to
+#       about chunk_size * N values per temporary.
+#
+#   Returns ( elem_integrals, total ), where elem_integrals has shape (E, ...).
+#
+    rule = _get_rule( order, degree )
+    N = ref_shape_functions( rule.px, rule.py )
+    n_elems = elems.shape[0]
+
+    elem_integrals = None
+    for start in range( 0, n_elems, chunk_size ):
+        stop = min( start + chunk_size, n_elems )
+        blk = elems[ start:stop ]
+
+        _, detJ = element_jacobians( nodes, blk )
+        xq = np.einsum( 'qk,ekd->eqd', N, nodes[ blk ] )
+        fq = np.asarray( func( xq[...,0], xq[...,1] ) )
+
+        Ie = np.einsum( 'eq...,q,e->e...', fq, rule.ww, np.abs( detJ ) )
+        if elem_integrals is None:
+            elem_integrals = np.empty( ( n_elems, ) + Ie.shape[1:], dtype=Ie.dtype )
+        elem_integrals[ start:stop ] = Ie
+
+    if elem_integrals is None:
+        elem_integrals = np.zeros( 0 )
+
+    return elem_integrals, elem_integrals.sum( axis=0 )
@@ -0,0 +1,199 @@
+import os
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from types import SimpleNamespace
+
+from quad_rule_triangles import get_quad_rule
+from tri_assembly import local_mass, local_stiffness
+from tri_mesh_integration import element_jacobians, ref_shape_functions
+
+#########################################################################################
+# Multi-core processing of element blocks
+#
+# Elements are split in contiguous blocks and every block is handed to a worker.
+# The thread backend relies on NumPy releasing the GIL inside large ufunc/einsum
+# calls; the process backend shares the input arrays through shared memory.
+# Block results are always combined in block order, and the block boundaries do
+# not depend on the number of workers, so results are bitwise reproducible.
+#########################################################################################
+
+def default_block_size( bytes_per_elem, cache_bytes=2**20 ):
+#
+#   Number of elements whose temporaries fit in about cache_bytes (L2 sized).
+#
+    return int( max( 256, cache_bytes // max( 1, bytes_per_elem ) ) )
+
+def element_blocks( n_elems, block_size ):
+    return [ ( start, min( start + block_size, n_elems ) )
+             for start in range( 0, n_elems, block_size ) ]
+
+#~==============================================================================
+_shared = ()
+
+def _attach_shared( specs ):
+    global _shared, _shared_handles
+    _shared_handles = [ shared_memory.SharedMemory( name=name ) for ( name, _, _ ) in specs ]
+    _shared = tuple( np.ndarray( shape, dtype=dtype, buffer=shm.buf )
+                     for ( shm, ( _, shape, dtype ) ) in zip( _shared_handles, specs ) )
+
+def _run_shared( kernel, start, stop, args ):
+    return kernel( start, stop, *_shared, *args )
+
+def run_blocks( kernel, n_elems, arrays=(), args=(), out=(), block_size=65536,
+                n_workers=None, backend='thread' ):
+#
+#   kernel:
+#       kernel( start, stop, *arrays, *out, *args ) processes elements [start, stop).
+#       It may return a value and/or write its slice of the out arrays. For the
+#       process backend it must be a module level (picklable) function.
+#   arrays / out:
+#       Input and output arrays. With backend='process' they are placed in shared
+#       memory and the out arrays are copied back when all blocks are done.
+#   backend:
+#       'thread', 'process' or 'serial'.
+#
+#   Returns the list of kernel results in block order.
+#
+    blocks = element_blocks( n_elems, block_size )
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+
+    if backend == 'serial' or n_workers == 1 or len( blocks ) == 1:
+        return [ kernel( start, stop, *arrays, *out, *args ) for ( start, stop ) in blocks ]
+
+    if backend == 'thread':
+        with ThreadPoolExecutor( n_workers ) as pool:
+            futures = [ pool.submit( kernel, start, stop, *arrays, *out, *args )
+                        for ( start, stop ) in blocks ]
+            return [ f.result() for f in futures ]
+
+    if backend != 'process':
+        raise Exception( 'Unknown backend %s!' % backend )
+
+    handles, specs = [], []
+    try:
+        for a in tuple( arrays ) + tuple( out ):
+            a = np.ascontiguousarray( a )
+            shm = shared_memory.SharedMemory( create=True, size=max( 1, a.nbytes ) )
+            np.ndarray( a.shape, dtype=a.dtype, buffer=shm.buf )[...] = a
+            handles.append( shm )
+            specs.append( ( shm.name, a.shape, a.dtype.str ) )
+
+        with ProcessPoolExecutor( n_workers, initializer=_attach_shared, initargs=( specs, ) ) as pool:
+            futures = [ pool.submit( _run_shared, kernel, start, stop, args ) for ( start, stop ) in blocks ]
+            results = [ f.result() for f in futures ]
+
+        for ( o, shm, ( _, shape, dtype ) ) in zip( out, handles[ len( arrays ): ], specs[ len( arrays ): ] ):
+            o[...] = np.ndarray( shape, dtype=dtype, buffer=shm.buf )
+        return results
+    finally:
+        for shm in handles:
+            shm.close()
+            shm.unlink()
+
+def reduce_blocks( results, zero=0.0 ):
+#
+#   Sum of the block results in block order (deterministic floating point);
+#   zero is returned when there are no blocks (empty mesh).
+#
+    if not results:
+        return zero
+    total = results[0]
+    for r in results[1:]:
+        total = total + r
+    return total
+
+#~==============================================================================
+def _integrate_block( start, stop, nodes, elems, elem_integrals, func, order ):
+    rule = get_quad_rule( order )
+    blk = elems[ start:stop ]
+    _, detJ = element_jacobians( nodes, blk )
+    xq = np.einsum( 'qk,ekd->eqd', ref_shape_functions( rule.px, rule.py ), nodes[ blk ] )
+    fq = np.asarray( func( xq[...,0], xq[...,1] ) )
+    elem_integrals[ start:stop ] = np.einsum( 'eq,q,e->e', fq, rule.ww, np.abs( detJ ) )
+    return elem_integrals[ start:stop ].sum()
+
+def parallel_integrate_mesh( nodes, elems, func, order=7, block_size=None, n_workers=None, backend='thread' ):
+#
+#   Multi-core version of tri_mesh_integration.integrate_mesh for scalar
+#   integrands. Returns ( elem_integrals, total ).
+#
+    nq = get_quad_rule( order ).ww.size
+    if block_size is None:
+        block_size = default_block_size( 8 * nq * 6 )
+    elem_integrals = np.empty( elems.shape[0] )
+    results = run_blocks( _integrate_block, elems.shape[0], ( nodes, elems ), ( func, order ),
+                          ( elem_integrals, ), block_size, n_workers, backend )
+    return elem_integrals, reduce_blocks( results )
+
+def _local_block( start, stop, invJ, wdetJ, values, grads, local, which ):
+    geom  = SimpleNamespace( invJ=invJ[ start:stop ], wdetJ=wdetJ[ start:stop ] )
+    table = SimpleNamespace( values=values, grads=grads )
+    f = local_mass if which == 'mass' else local_stiffness
+    local[ start:stop ] = f( geom, table )
+
+def parallel_assemble( assembler, which='mass', coeff=None, A=None, block_size=None,
+                       n_workers=None, backend='thread' ):
+#
+#   Multi-core version of TriAssembler.mass / TriAssembler.stiffness: the local
+#   matrices are computed block-wise in parallel and scattered with the
+#   precomputed sparsity pattern.
+#
+    geom, table = assembler.geom, assembler.table
+    nb, nq = table.values.shape
+    wdetJ = geom.wdetJ
+    if coeff is not None:
+        coeff = np.asarray( coeff )
+        wdetJ = wdetJ * ( coeff[:,None] if coeff.ndim == 1 else coeff )
+    if block_size is None:
+        block_size = default_block_size( 8 * nb * nb * ( nq + 1 ) )
+
+    local = np.empty( ( wdetJ.shape[0], nb, nb ) )
+    run_blocks( _local_block, wdetJ.shape[0], ( geom.invJ, wdetJ, table.values, table.grads ),
+                ( which, ), ( local, ), block_size, n_workers, backend )
+    pattern = assembler.pattern
+    return pattern.assemble( local ) if A is None else pattern.update( A, local )
+
+#~==============================================================================
+def autotune_block_size( kernel, n_elems, arrays=(), args=(), out=(),
+                         candidates=( 1024, 4096, 16384, 65536, 262144 ),
+                         n_workers=None, backend='thread', repeats=3 ):
+#
+#   Times run_blocks for every candidate block size on the given mesh and
+#   returns ( best_block_size, { block_size: best time in seconds } ).
+#
+    timings = {}
+    for bs in candidates:
+        if bs > 4 * n_elems and timings:
+            continue
+        t_best = np.inf
+        for _ in range( repeats ):
+            t0 = time.perf_counter()
+            run_blocks( kernel, n_elems, arrays, args, out, bs, n_workers, backend )
+            t_best = min( t_best, time.perf_counter() - t0 )
+        timings[ bs ] = t_best
+    return min( timings, key=timings.get ), timings
+
+
+def _bench_integrand( x, y ):
+    return np.sin( x ) * np.cos( y )
+
+if __name__ == '__main__':
+
+    n = 1000
+    xs = np.linspace( 0.0, 1.0, n+1 )
+    X, Y = np.meshgrid( xs, xs )
+    nodes = np.c_[ X.ravel(), Y.ravel() ]
+    i, j = np.meshgrid( np.arange( n ), np.arange( n ) )
+    p = ( j * (n+1) + i ).ravel()
+    elems = np.concatenate( ( np.c_[ p, p+1, p+n+2 ], np.c_[ p, p+n+2, p+n+1 ] ) )
+    out = np.empty( elems.shape[0] )
+
+    for backend in ( 'serial', 'thread' ):
+        bs, timings = autotune_block_size( _integrate_block, elems.shape[0], ( nodes, elems ),
+                                           ( _bench_integrand, 7 ), ( out, ), backend=backend )
+        print( f'{backend:8s} E={elems.shape[0]} best block={bs}' )
+        for ( k, t ) in timings.items():
+            print( f'    {k:8d}  {t*1e3:8.2f} ms' )
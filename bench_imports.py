@@ -0,0 +1,45 @@
+# Import time of the library modules and the heavy dependencies they pull in
+#
+#   python bench_imports.py
+#
+# Every module is imported in a fresh interpreter; the time reported is the
+# import itself, without the interpreter startup.
+
+import os
+import subprocess
+import sys
+
+modules = ( 'nonlinear_CG', 'mp_GaussLegendre', 'h5_tools', 'h5_storage', 'h5_cache',
+            'h5_async', 'h5_sweep', 'owc_coeffs', 'mpl_utils', 'label_lines_core',
+            'quad_rule_triangles', 'tri_assembly', 'tri_parallel', 'sw_dg_kernel' )
+
+heavy = ( 'h5py', 'matplotlib', 'sympy', 'mpmath', 'scipy', 'cycler' )
+
+probe = '''
+import sys, time
+t0 = time.perf_counter()
+import {module}
+t1 = time.perf_counter()
+loaded = [ m for m in {heavy!r} if m in sys.modules ]
+print( '%.1f %s' % ( ( t1 - t0 ) * 1e3, ','.join( loaded ) or '-' ) )
+'''
+
+
+def import_time( module, repeats=3 ):
+    here = os.path.dirname( os.path.abspath( __file__ ) )
+    env = dict( os.environ, PYTHONPATH=os.pathsep.join( ( here, os.path.join( here, 'SW2D' ) ) ) )
+    best, loaded = None, None
+    for _ in range( repeats ):
+        out = subprocess.run( [ sys.executable, '-c', probe.format( module=module, heavy=heavy ) ],
+                              capture_output=True, text=True, env=env, cwd=here, check=True )
+        t, loaded = out.stdout.splitlines()[-1].split()
+        best = float( t ) if best is None else min( best, float( t ) )
+    return best, loaded
+
+
+if __name__ == '__main__':
+
+    print( f'{"module":20s} {"import ms":>10s}  heavy modules loaded' )
+    for module in modules:
+        t, loaded = import_time( module )
+        print( f'{module:20s} {t:10.1f}  {loaded}' )
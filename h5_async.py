@@ -0,0 +1,108 @@
+import queue
+import threading
+import numpy as np
+from lazy_import import LazyModule
+
+import h5_tools
+
+h5py = LazyModule( 'h5py' )
+
+
+class HDFAsyncWriter:
+    '''Non-blocking HDF5 output: a writer thread owns the file and drains a queue.
+
+    Parameters
+    ----------
+    filename : str
+       Output file, opened by the writer thread.
+    mode : str, optional
+       h5py.File mode.
+    maxsize : int, optional
+       Queue length. When it is full the calls block until the writer catches
+       up (back-pressure), so memory use stays bounded.
+    kwargs : dict, optional
+       Extra arguments of h5py.File.
+
+    The save_hdf_* methods mirror h5_tools but take no file argument; arrays are
+    copied when queued, so the caller may reuse its buffers immediately. An
+    exception raised in the writer is re-raised by the next call (or by
+    flush/close) and the pending writes are discarded.
+    '''
+
+    def __init__( self, filename, mode='w', maxsize=16, **kwargs ):
+        self._queue  = queue.Queue( maxsize )
+        self._error  = None
+        self._closed = False
+        self._opened = threading.Event()
+        self._thread = threading.Thread( target=self._run, args=( filename, mode, kwargs ), daemon=True )
+        self._thread.start()
+        self._opened.wait()
+        self._check()
+
+    def _run( self, filename, mode, kwargs ):
+        try:
+            f = h5py.File( filename, mode, **kwargs )
+        except BaseException as e:
+            self._error = e
+            self._closed = True
+            self._opened.set()
+            return
+        self._opened.set()
+
+        with f:
+            while True:
+                item = self._queue.get()
+                try:
+                    if item is None:
+                        break
+                    if self._error is None:
+                        func, args, kwargs = item
+                        func( f, *args, **kwargs )
+                except BaseException as e:
+                    self._error = e
+                finally:
+                    self._queue.task_done()
+
+    def _check( self ):
+        if self._error is not None:
+            e, self._error = self._error, None
+            raise RuntimeError( 'Background HDF5 write failed' ) from e
+
+    def submit( self, func, *args, **kwargs ):
+#
+#       Queues func( hdf5_file, *args, **kwargs ) for the writer thread.
+#
+        self._check()
+        if self._closed:
+            raise RuntimeError( 'HDFAsyncWriter is closed' )
+        self._queue.put( ( func, args, kwargs ) )
+
+    def save_hdf_array( self, group, name, fdata, **kwargs ):
+        self.submit( h5_tools.save_hdf_array, group, name, np.array( fdata ), **kwargs )
+
+    def save_hdf_scalar( self, group, name, fdata ):
+        self.submit( h5_tools.save_hdf_scalar, group, name, np.array( fdata ) )
+
+    def save_hdf_string( self, group, name, fdata ):
+        self.submit( h5_tools.save_hdf_string, group, name, fdata )
+
+    def flush( self ):
+#
+#       Barrier: returns when everything queued so far is written and flushed.
+#
+        self.submit( lambda f: f.flush() )
+        self._queue.join()
+        self._check()
+
+    def close( self ):
+        if not self._closed:
+            self._closed = True
+            self._queue.put( None )
+            self._thread.join()
+        self._check()
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *exc ):
+        self.close()
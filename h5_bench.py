@@ -0,0 +1,67 @@
+# Write/read throughput and compression ratio of the h5_tools write profiles
+#
+#   python h5_bench.py [file.h5 group]
+#
+# benchmarks the arrays of the given group (default: hydro of PICO_OWC_Coeffs.h5)
+# plus a synthetic smooth field of the size of a typical simulation output.
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+import h5py
+
+import h5_tools
+
+
+def benchmark_write_profiles( arrays, profiles=None, access='row', repeats=3 ):
+#
+#   arrays:
+#       dict name -> ndarray, written together as one group.
+#   Returns a list of ( profile, write MB/s, read MB/s, compression ratio ).
+#
+    if profiles is None:
+        profiles = list( h5_tools.hdf_write_profiles )
+    nbytes = sum( np.asarray( a ).nbytes for a in arrays.values() )
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join( tmp, 'bench.h5' )
+        for profile in profiles:
+            t_write = t_read = np.inf
+            for _ in range( repeats ):
+                t0 = time.perf_counter()
+                with h5py.File( filename, 'w' ) as f:
+                    for ( name, a ) in arrays.items():
+                        h5_tools.save_hdf_array( f, '/', name, a, profile=profile, access=access )
+                t_write = min( t_write, time.perf_counter() - t0 )
+
+                t0 = time.perf_counter()
+                with h5py.File( filename, 'r' ) as f:
+                    for name in arrays:
+                        h5_tools.load_hdf_array( f, '/', name )
+                t_read = min( t_read, time.perf_counter() - t0 )
+
+            ratio = nbytes / os.path.getsize( filename )
+            results.append( ( profile, nbytes / t_write / 1e6, nbytes / t_read / 1e6, ratio ) )
+    return results
+
+
+if __name__ == '__main__':
+
+    filename, group = ( sys.argv[1], sys.argv[2] ) if len( sys.argv ) > 2 else ( 'PICO_OWC_Coeffs.h5', 'hydro' )
+
+    arrays = {}
+    with h5py.File( filename, 'r' ) as f:
+        for ( key, val ) in f[ group ].items():
+            if isinstance( val, h5py.Dataset ) and val.ndim > 0:
+                arrays[ key ] = val[()]
+
+    t = np.linspace( 0.0, 100.0, 2000 )
+    x = np.linspace( 0.0, 1.0, 2000 )
+    arrays[ 'field' ] = np.sin( t[:,None] - 6.0 * x[None,:] ) * np.exp( -0.01 * t[:,None] )
+
+    print( f'{"profile":12s} {"write MB/s":>11s} {"read MB/s":>10s} {"ratio":>7s}' )
+    for ( profile, w, r, ratio ) in benchmark_write_profiles( arrays ):
+        print( f'{profile:12s} {w:11.1f} {r:10.1f} {ratio:7.2f}' )
@@ -0,0 +1,111 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from lazy_import import LazyModule
+
+h5py = LazyModule( 'h5py' )
+
+
+def _read_dataset( hdf5_Input, path ):
+    val = hdf5_Input[ path ][()]
+    if isinstance( val, bytes ):
+        val = val.decode( 'utf-8' )
+    return val
+
+def _freeze( val ):
+#
+#   Cached values are shared between callers, so arrays are made read-only.
+#   Returns the value and its size in bytes.
+#
+    if isinstance( val, np.ndarray ):
+        val.flags.writeable = False
+        return val, val.nbytes
+    if isinstance( val, dict ):
+        nbytes = 0
+        for key in val:
+            val[ key ], n = _freeze( val[ key ] )
+            nbytes += n
+        return val, nbytes
+    return val, 64
+
+
+class HDFCache:
+    '''Read-through LRU cache of HDF5 datasets.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+       Memory budget; the least recently used entries are evicted beyond it.
+
+    Entries are keyed by (real path, inode, mtime, size, dataset path), so a
+    rewritten file never returns stale data: when the identity of a file
+    changes, all its entries are dropped. Returned arrays are read-only.
+    Meant for input files that are not open for writing in the same process.
+    '''
+
+    def __init__( self, max_bytes=512 * 2**20 ):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._files = {}
+        self._lock = threading.RLock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _file_id( self, filename ):
+        real = os.path.realpath( filename )
+        st = os.stat( real )
+        fid = ( real, st.st_ino, st.st_mtime_ns, st.st_size )
+        if self._files.get( real, fid ) != fid:
+            for key in [ k for k in self._entries if k[0] == real ]:
+                self._drop( key )
+        self._files[ real ] = fid
+        return fid
+
+    def _drop( self, key ):
+        del self._entries[ key ]
+        self.nbytes -= self._sizes.pop( key )
+
+    def get( self, filename, path, loader=_read_dataset ):
+#
+#       Returns loader( hdf5_file, path ) from the cache or from the file. The
+#       default loader reads the dataset at path.
+#
+        with self._lock:
+            key = self._file_id( filename ) + ( path, )
+            if key in self._entries:
+                self._entries.move_to_end( key )
+                self.hits += 1
+                return self._entries[ key ]
+            self.misses += 1
+
+        with h5py.File( filename, 'r' ) as f:
+            val, nbytes = _freeze( loader( f, path ) )
+
+        with self._lock:
+            if nbytes <= self.max_bytes and key not in self._entries:
+                self._entries[ key ] = val
+                self._sizes[ key ] = nbytes
+                self.nbytes += nbytes
+                while self.nbytes > self.max_bytes:
+                    self._drop( next( iter( self._entries ) ) )
+                    self.evictions += 1
+        return val
+
+    def clear( self ):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._files.clear()
+            self.nbytes = 0
+
+    def stats( self ):
+        return { 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                 'entries': len( self._entries ), 'nbytes': self.nbytes }
+
+
+# Shared default cache
+hdf_cache = HDFCache()
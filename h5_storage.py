@@ -1,37 +1,130 @@
+import hashlib
 import numpy as np
-import h5py
+from lazy_import import LazyModule
 
+import h5_tools
 
-def load_data( filename, group ):
+h5py = LazyModule( 'h5py' )
+
+
+def load_data( filename, group, lazy=False, cache=None ):
+#
+#   lazy:  return a h5_tools.LazyGroup view that reads on access.
+#   cache: h5_cache.HDFCache (e.g. h5_cache.hdf_cache) that keeps the loaded
+#          dict, with read-only arrays, until the file changes.
+#
+    if lazy:
+        return h5_tools.LazyGroup( filename, group )
+    if cache is not None:
+        return cache.get( filename, group, lambda f, path: _load_group( f[path] ) )
 
-    data_dic = {}
     with h5py.File( filename, 'r') as f:
-        for ( key, val ) in f[group].items():
-            val = f[ group ][ key ][()]
-            if type( val ) == np.bytes_:
-                val = val.decode('utf-8')
-            data_dic[key] = val 
-        return data_dic
+        return _load_group( f[group] )
+
+
+def _load_group( grp ):
+
+    data_dic = {}
+    for ( key, val ) in grp.attrs.items():
+        if type( val ) in ( bytes, np.bytes_ ):
+            val = val.decode('utf-8')
+        data_dic[key] = val
+    for ( key, val ) in grp.items():
+        if isinstance( val, h5py.Group ):
+            data_dic[key] = _load_group( val )
+            continue
+        val = val[()]
+        if type( val ) == np.bytes_:
+            val = val.decode('utf-8')
+        data_dic[key] = val 
+    return data_dic
     
 
-def save_data( filename, grp_name, data_dic ):
+def save_data( filename, grp_name, data_dic, mode='w', small_as_attrs=True ):
+#
+#   mode = 'w' rewrites the file. mode = 'a' updates it in place: keys whose
+#   content hash, dtype and shape match the stored dataset are skipped, changed
+#   keys are overwritten in place when dtype and shape allow it and recreated
+#   otherwise. Keys absent from data_dic are left untouched. Nested dicts are
+#   saved as subgroups.
+#
+#   With small_as_attrs, scalars and strings are stored as attributes of the
+#   group, which live in its object header, instead of one dataset each.
+#   load_data reads both layouts.
+#
+    with h5py.File( filename, mode ) as f:
+        _save_group( f.require_group( grp_name ), data_dic, mode != 'w', small_as_attrs )
+
+
+def _content_hash( val ):
+    h = hashlib.sha1( ( val.dtype.str + str( val.shape ) ).encode() )
+    h.update( np.ascontiguousarray( val ).data )
+    return h.hexdigest()
+
+
+def _is_small( val ):
+    return isinstance( val, ( str, bytes ) ) or np.ndim( val ) == 0
+
+
+def _same_attr( old, val ):
+    try:
+        return np.asarray( old ).dtype == np.asarray( val ).dtype and bool( old == val )
+    except ( TypeError, ValueError ):
+        return False
+
+
+def _save_group( grp, data_dic, update, small_as_attrs ):
+
+    for (key,val) in data_dic.items():
+        if isinstance( val, dict ):
+            if update:
+                if key in grp and not isinstance( grp[key], h5py.Group ):
+                    del grp[key]
+                if key in grp.attrs:
+                    del grp.attrs[key]
+            _save_group( grp.require_group( key ), val, update, small_as_attrs )
+            continue
+
+        if small_as_attrs and _is_small( val ):
+            if update:
+                if key in grp:
+                    del grp[key]
+                if key in grp.attrs and _same_attr( grp.attrs[key], val ):
+                    continue
+            grp.attrs[key] = val
+            continue
+        if update and key in grp.attrs:
+            del grp.attrs[key]
+
+        if type( val ) == str:
+            val = np.bytes_( val.encode() )
+        val = np.array( val )
+        digest = _content_hash( val )
+
+        if update and key in grp:
+            ds = grp[key]
+            if isinstance( ds, h5py.Dataset ) and ds.shape == val.shape and ds.dtype == val.dtype:
+                if ds.attrs.get( 'sha1' ) != digest:
+                    ds[...] = val
+                    ds.attrs['sha1'] = digest
+                continue
+            del grp[key]
+
+        ds = grp.create_dataset( key, data=val )
+        ds.attrs['sha1'] = digest
 
-    with h5py.File( filename, 'w') as f:
-        for (key,val) in data_dic.items():
-            if type( val ) == str:
-                val = np.bytes_( val.encode() )
-            f.create_dataset( grp_name + '/' + key, data=np.array( val ) )
 
+if __name__ == '__main__':
 
-sv_dic = {  'name': 'joão',
-            'degree': 3,
-            'delta': 0.1,
-            'x': np.array( (1,2,3,4,5) ),
-            'y': np.array( (10,20,30,40,50) ),
-        }
+    sv_dic = {  'name': 'joão',
+                'degree': 3,
+                'delta': 0.1,
+                'x': np.array( (1,2,3,4,5) ),
+                'y': np.array( (10,20,30,40,50) ),
+            }
 
-save_data( 'text.h5', 'case', sv_dic )
+    save_data( 'text.h5', 'case', sv_dic )
 
-ld_dic = load_data( 'text.h5', 'case'  )
+    ld_dic = load_data( 'text.h5', 'case'  )
 
-print( ld_dic )
\ No newline at end of file
+    print( ld_dic )
\ No newline at end of file
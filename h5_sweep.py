@@ -0,0 +1,74 @@
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+from lazy_import import LazyModule
+
+import h5_tools
+
+h5py = LazyModule( 'h5py' )
+
+
+def _read_case( filename, paths ):
+    with h5py.File( filename, 'r' ) as f:
+        return [ f[ p ][()] for p in paths ]
+
+def load_sweep( pattern, paths, n_workers=None, out_file=None, out_group='/sweep/', profile=None ):
+#
+#   Stacks the same datasets of many files of identical layout (e.g. one file
+#   per case of a parameter sweep).
+#
+#   pattern:
+#       glob of the files; the cases follow the sorted file names.
+#   paths:
+#       dataset paths to read from every file.
+#   n_workers:
+#       processes used to read and decompress the files (1 = serial).
+#   out_file:
+#       optional file where the stacked arrays and the list of cases are saved,
+#       for a fast reload with load_sweep_file.
+#
+#   Returns ( files, stacked ), where stacked[path] has shape (n_cases,) + shape
+#   of the dataset and is allocated once before reading.
+#
+    files = sorted( glob.glob( pattern ) )
+    if not files:
+        raise Exception( 'No files match %s!' % pattern )
+
+    with h5py.File( files[0], 'r' ) as f:
+        stacked = { p: np.empty( ( len( files ), ) + f[ p ].shape, dtype=f[ p ].dtype ) for p in paths }
+
+    if n_workers == 1:
+        results = map( _read_case, files, repeat( paths ) )
+        _fill( stacked, paths, files, results )
+    else:
+        n_workers = n_workers or os.cpu_count() or 1
+        with ProcessPoolExecutor( n_workers ) as pool:
+            chunksize = max( 1, len( files ) // ( 4 * n_workers ) )
+            results = pool.map( _read_case, files, repeat( paths ), chunksize=chunksize )
+            _fill( stacked, paths, files, results )
+
+    if out_file is not None:
+        with h5py.File( out_file, 'w' ) as f:
+            for p in paths:
+                h5_tools.save_hdf_array( f, out_group, p.strip( '/' ), stacked[ p ], profile=profile )
+            f.create_dataset( out_group + 'cases', data=files, dtype=h5py.string_dtype() )
+
+    return files, stacked
+
+def _fill( stacked, paths, files, results ):
+    for ( i, vals ) in enumerate( results ):
+        for ( p, v ) in zip( paths, vals ):
+            if v.shape != stacked[ p ].shape[1:]:
+                raise Exception( '%s:%s has shape %s, expected %s!' % ( files[i], p, v.shape, stacked[ p ].shape[1:] ) )
+            stacked[ p ][ i ] = v
+
+def load_sweep_file( filename, paths, out_group='/sweep/' ):
+#
+#   Reloads the result of load_sweep( ..., out_file=filename ).
+#
+    with h5py.File( filename, 'r' ) as f:
+        files = [ s.decode( 'utf-8' ) if isinstance( s, bytes ) else s for s in f[ out_group + 'cases' ][()] ]
+        stacked = { p: h5_tools.load_hdf_array( f, out_group, p.strip( '/' ) ) for p in paths }
+    return files, stacked
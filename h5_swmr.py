@@ -0,0 +1,124 @@
+import time
+from lazy_import import LazyModule
+
+import h5_tools
+
+h5py = LazyModule( 'h5py' )
+
+
+class HDFSWMRWriter:
+    '''Single-writer side of a live-monitored output file.
+
+    Parameters
+    ----------
+    filename : str
+       Output file, created with libver='latest'.
+    datasets : dict
+       name -> ( step_shape, dtype ) of every series. SWMR does not allow new
+       objects once it is enabled, so all series are created up front.
+    buffer_steps : int, optional
+       Steps buffered in memory per series (see h5_tools.HDFSeriesWriter).
+    flush_interval : float, optional
+       Seconds between flushes made visible to the readers by append.
+    profile : str, optional
+       Entry of h5_tools.hdf_write_profiles.
+    '''
+
+    def __init__( self, filename, datasets, buffer_steps=16, flush_interval=1.0, profile=None ):
+        self.file = h5py.File( filename, 'w', libver='latest' )
+        self.series = { name: h5_tools.HDFSeriesWriter( self.file, '/', name, shape, dtype,
+                                                        buffer_steps, profile )
+                        for ( name, ( shape, dtype ) ) in datasets.items() }
+        self.file.swmr_mode = True
+        self.flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+
+    def append( self, name, step ):
+        self.series[ name ].append( step )
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush( self ):
+#
+#       Writes the buffered steps and flushes every series, so that readers
+#       see all rows appended so far.
+#
+        for s in self.series.values():
+            s.flush()
+            s.ds.flush()
+        self._last_flush = time.monotonic()
+
+    def close( self ):
+        if self.file:
+            self.flush()
+            self.file.close()
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *exc ):
+        self.close()
+
+
+class HDFSWMRReader:
+    '''Reader of a file written by HDFSWMRWriter (or any SWMR writer).
+
+    Parameters
+    ----------
+    filename : str
+       File being written.
+    names : list of str, optional
+       Series to follow, by default every dataset with an unlimited first axis.
+
+    ``poll`` returns only the rows appended since the previous call; the reader
+    never locks or modifies the file.
+    '''
+
+    def __init__( self, filename, names=None ):
+        self.file = h5py.File( filename, 'r', libver='latest', swmr=True )
+        if names is None:
+            names = []
+            self.file.visititems( lambda name, obj: names.append( name )
+                                  if isinstance( obj, h5py.Dataset ) and obj.maxshape[:1] == ( None, )
+                                  else None )
+        self.names = list( names )
+        self._pos = { name: 0 for name in self.names }
+
+    def poll( self ):
+#
+#       Returns { name: new rows } for the series that grew since the last call.
+#
+        new = {}
+        for name in self.names:
+            ds = self.file[ name ]
+            ds.refresh()
+            n = ds.shape[0]
+            if n > self._pos[ name ]:
+                new[ name ] = ds[ self._pos[ name ]:n ]
+                self._pos[ name ] = n
+        return new
+
+    def follow( self, interval=1.0, timeout=None ):
+#
+#       Generator of poll results, polling every interval seconds and stopping
+#       after timeout seconds without new rows (never, if timeout is None).
+#
+        last = time.monotonic()
+        while True:
+            new = self.poll()
+            if new:
+                last = time.monotonic()
+                yield new
+            elif timeout is not None and time.monotonic() - last > timeout:
+                return
+            else:
+                time.sleep( interval )
+
+    def close( self ):
+        self.file.close()
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *exc ):
+        self.close()
@@ -1,25 +1,337 @@
-import h5py
 import numpy as np
+from lazy_import import LazyModule
+
+h5py = LazyModule( 'h5py' )
 
 #~==============================================================================
-def save_hdf_array( hdf5_Output, group, name, fdata ):
-    hdf5_Output.create_dataset( group + name, data=fdata, 
-                                compression="gzip", compression_opts=9  )
+# Write profiles of save_hdf_array: keyword arguments of create_dataset.
+# 'legacy' is the original gzip 9 without shuffle, kept as the default.
+hdf_write_profiles = { 'legacy':     dict( compression="gzip", compression_opts=9 ),
+                       'lzf':        dict( compression="lzf", shuffle=True ),
+                       'contiguous': dict() }
+for level in range( 1, 10 ):
+    hdf_write_profiles[ 'gzip%d' % level ] = dict( compression="gzip", compression_opts=level,
+                                                   shuffle=True )
+
+def hdf_chunk_shape( shape, itemsize, access='row', target_bytes=2**20 ):
+#
+#   Chunk shape of about target_bytes for the typical access pattern:
+#       'row':    reading whole rows a[i,...]   (e.g. time steps), the leading
+#                 axis is shrunk first
+#       'column': reading along the leading axis a[:,j], the trailing axes are
+#                 shrunk first
+#       'block':  square-ish blocks, the largest axis is shrunk first
+#
+    chunk = [ max( 1, int( n ) ) for n in shape ]
+    if access == 'row':
+        axes = list( range( len( chunk ) ) )
+    elif access == 'column':
+        axes = list( range( len( chunk ) ) )[::-1]
+    elif access != 'block':
+        raise Exception( 'Unknown access pattern %s!' % access )
+
+    while np.prod( chunk ) * itemsize > target_bytes:
+        if access == 'block':
+            ax = int( np.argmax( chunk ) )
+        else:
+            ax = next( a for a in axes if chunk[a] > 1 )
+        excess = np.prod( chunk ) * itemsize / target_bytes
+        chunk[ ax ] = max( 1, int( chunk[ ax ] / excess ) )
+    return tuple( chunk )
+
+#~==============================================================================
+def save_hdf_array( hdf5_Output, group, name, fdata, profile=None, access='row' ):
+    fdata = np.asarray( fdata )
+    opts = dict( hdf_write_profiles[ profile or save_hdf_array.profile ] )
+    if opts and fdata.ndim > 0 and fdata.size > 0:
+        opts[ 'chunks' ] = hdf_chunk_shape( fdata.shape, fdata.dtype.itemsize, access )
+    hdf5_Output.create_dataset( group + name, data=fdata, **opts )
+save_hdf_array.profile = 'legacy'
 
 def save_hdf_scalar( hdf5_Output, group, name, fdata ):
     hdf5_Output.create_dataset( group + name, data=fdata )
 
 def save_hdf_string( hdf5_Output, group, name, fdata ):
-    hdf5_Output.create_dataset( group + name, data=fdata, 
+    if save_hdf_string.dt_str is None:
+        save_hdf_string.dt_str = h5py.special_dtype( vlen=bytes )
+    hdf5_Output.create_dataset( group + name, data=fdata,
                                 dtype=save_hdf_string.dt_str )
-save_hdf_string.dt_str = h5py.special_dtype( vlen=bytes )
+save_hdf_string.dt_str = None
+
+def save_hdf_attrs( hdf5_Output, group, fdata_dic ):
+#
+#   Small values (scalars, strings) as attributes of one group, stored in its
+#   object header instead of one dataset each.
+#
+    attrs = hdf5_Output.require_group( group ).attrs
+    for ( key, val ) in fdata_dic.items():
+        attrs[ key ] = val
+
+def save_hdf_record( hdf5_Output, group, name, fdata_dic ):
+#
+#   Small values as the fields of one compound (structured) scalar dataset,
+#   written with a single call. Strings become variable length UTF-8 fields.
+#
+    fields = []
+    for ( key, val ) in fdata_dic.items():
+        dt = h5py.string_dtype() if isinstance( val, str ) else np.asarray( val ).dtype
+        fields.append( ( key, dt ) )
+    record = np.empty( (), dtype=fields )
+    for ( key, val ) in fdata_dic.items():
+        record[ key ] = val
+    hdf5_Output.create_dataset( group + name, data=record )
 
 #~==============================================================================
-def load_hdf_array( hdf5_Input, group, name ):
+def load_hdf_attrs( hdf5_Input, group ):
+    return { key: ( val.decode( 'utf-8' ) if isinstance( val, bytes ) else val )
+             for ( key, val ) in hdf5_Input[ group ].attrs.items() }
+
+def load_hdf_record( hdf5_Input, group, name ):
+    record = hdf5_Input[ group + name ][()]
+    return { key: ( record[ key ].decode( 'utf-8' ) if isinstance( record[ key ], bytes ) else record[ key ] )
+             for key in record.dtype.names }
+
+def load_hdf_array( hdf5_Input, group, name, lazy=False, memmap=False, cache=None ):
+    if cache is not None:
+        return cache.get( hdf5_Input.file.filename, hdf5_Input[ group + name ].name )
+    if lazy:
+        return LazyArray( hdf5_Input, group + name )
+    if memmap:
+        mm = load_hdf_memmap( hdf5_Input, group, name )
+        if mm is not None:
+            return mm
     return np.array( hdf5_Input[ group + name ] )
 
+def load_hdf_array_into( hdf5_Input, group, name, out ):
+#
+#   Reads the dataset straight into the caller-owned, C-contiguous array out
+#   (e.g. reused every time step), without allocating a temporary.
+#
+    ds = hdf5_Input[ group + name ]
+    if out.shape != ds.shape:
+        raise Exception( 'Buffer shape %s does not match dataset shape %s!' % ( out.shape, ds.shape ) )
+    ds.read_direct( out )
+    return out
+
+def load_hdf_memmap( hdf5_Input, group, name, mode='r' ):
+#
+#   numpy.memmap over the raw data of an uncompressed, contiguous dataset, so
+#   that it is paged in on demand. Returns None for chunked/filtered/empty
+#   datasets, which cannot be mapped.
+#
+    ds = hdf5_Input[ group + name ]
+    if ds.chunks is not None or ds.dtype.hasobject or ds.size == 0:
+        return None
+    offset = ds.id.get_offset()
+    if offset is None:
+        return None
+    return np.memmap( ds.file.filename, dtype=ds.dtype, mode=mode, offset=offset,
+                      shape=ds.shape, order='C' )
+
 def load_hdf_scalar( hdf5_Input, group, name ):
     return hdf5_Input[ group + name ][()]
 
 def load_hdf_string( hdf5_Input, group, name ):
     return hdf5_Input[ group + name ][()]
+
+#~==============================================================================
+# Time series: one resizable dataset per field instead of one dataset per step
+class HDFSeriesWriter:
+    '''Appends steps of a fixed shape to one resizable dataset.
+
+    Parameters
+    ----------
+    hdf5_Output : h5py.File or h5py.Group
+       Open output.
+    group, name : str
+       Location of the dataset, as in save_hdf_array.
+    step_shape : tuple
+       Shape of one step; the dataset has shape (n_steps,) + step_shape.
+    dtype : numpy dtype, optional
+    buffer_steps : int, optional
+       Number of steps kept in memory and written with one resize-and-write.
+    profile : str, optional
+       Entry of hdf_write_profiles, save_hdf_array.profile by default.
+    '''
+
+    def __init__( self, hdf5_Output, group, name, step_shape, dtype=np.float64,
+                  buffer_steps=64, profile=None ):
+        step_shape = tuple( step_shape )
+        dtype = np.dtype( dtype )
+        opts = dict( hdf_write_profiles[ profile or save_hdf_array.profile ] )
+        opts[ 'chunks' ] = hdf_chunk_shape( ( buffer_steps, ) + step_shape, dtype.itemsize, 'row' )
+
+        self.ds = hdf5_Output.create_dataset( group + name, shape=( 0, ) + step_shape,
+                                              maxshape=( None, ) + step_shape, dtype=dtype, **opts )
+        self._buf = np.empty( ( buffer_steps, ) + step_shape, dtype=dtype )
+        self._n = 0
+
+    def __len__( self ):
+        return self.ds.shape[0] + self._n
+
+    def append( self, step ):
+        self._buf[ self._n ] = step
+        self._n += 1
+        if self._n == self._buf.shape[0]:
+            self.flush()
+
+    def flush( self ):
+        n = self._n
+        if n:
+            n0 = self.ds.shape[0]
+            self.ds.resize( n0 + n, axis=0 )
+            self.ds[ n0:n0+n ] = self._buf[ :n ]
+            self._n = 0
+
+    def close( self ):
+        self.flush()
+
+    def __enter__( self ):
+        return self
+
+    def __exit__( self, *exc ):
+        self.close()
+
+def iter_hdf_series( hdf5_Input, group, name, block_steps=64, start=0, stop=None ):
+#
+#   Generator over the steps of a series, reading block_steps steps per access.
+#
+    ds = hdf5_Input[ group + name ]
+    stop = ds.shape[0] if stop is None else min( stop, ds.shape[0] )
+    for b in range( start, stop, block_steps ):
+        yield from ds[ b:min( b + block_steps, stop ) ]
+
+#~==============================================================================
+# Lazy access: nothing is read until the data is indexed
+class LazyArray:
+    '''Proxy of an HDF5 dataset that reads only what is indexed.
+
+    Parameters
+    ----------
+    source : h5py.File, h5py.Group or str
+       Open file/group (the proxy is valid while it stays open) or a file
+       name, which is opened for every read.
+    path : str
+       Dataset path inside source.
+
+    ``proxy[i, a:b]`` reads just that hyperslab; ``np.asarray( proxy )`` or
+    ``proxy[...]`` reads the whole array once and keeps it for later accesses.
+    '''
+
+    def __init__( self, source, path ):
+        self.source = source
+        self.path   = path
+        self._array = None
+        with self._dataset() as ds:
+            self.shape = ds.shape
+            self.dtype = ds.dtype
+
+    class _Opened:
+        def __init__( self, source, path ):
+            self.source, self.path, self.file = source, path, None
+        def __enter__( self ):
+            if isinstance( self.source, str ):
+                self.file = h5py.File( self.source, 'r' )
+                return self.file[ self.path ]
+            return self.source[ self.path ]
+        def __exit__( self, *exc ):
+            if self.file is not None:
+                self.file.close()
+
+    def _dataset( self ):
+        return LazyArray._Opened( self.source, self.path )
+
+    @property
+    def ndim( self ):
+        return len( self.shape )
+
+    @property
+    def size( self ):
+        return int( np.prod( self.shape ) )
+
+    def __len__( self ):
+        return self.shape[0]
+
+    def __repr__( self ):
+        state = 'loaded' if self._array is not None else 'lazy'
+        return '<LazyArray %s shape=%s dtype=%s (%s)>' % ( self.path, self.shape, self.dtype, state )
+
+    def read( self ):
+        if self._array is None:
+            with self._dataset() as ds:
+                self._array = ds[()]
+        return self._array
+
+    def __getitem__( self, key ):
+        if self._array is not None or key is Ellipsis or ( isinstance( key, tuple ) and not key ):
+            return self.read()[ key ]
+        with self._dataset() as ds:
+            return ds[ key ]
+
+    def __array__( self, dtype=None, copy=None ):
+        a = self.read()
+        return a if dtype is None else a.astype( dtype )
+
+
+class LazyGroup:
+    '''Read-only dict-like view of an HDF5 group of a file.
+
+    Scalars and strings (datasets or group attributes, as written by
+    h5_storage.save_data) are read on access, arrays are returned as LazyArray
+    and subgroups as LazyGroup, so opening the view reads only the key names.
+    '''
+
+    def __init__( self, filename, group ):
+        self.filename = filename
+        self.group = group.rstrip( '/' )
+        with h5py.File( filename, 'r' ) as f:
+            self._kinds = { key: 'attr' for key in f[ group ].attrs }
+            self._kinds.update( { key: ( 'group' if isinstance( val, h5py.Group ) else
+                                         'array' if val.ndim > 0 else 'scalar' )
+                                  for ( key, val ) in f[ group ].items() } )
+        self._items = {}
+
+    def keys( self ):
+        return self._kinds.keys()
+
+    def __iter__( self ):
+        return iter( self._kinds )
+
+    def __len__( self ):
+        return len( self._kinds )
+
+    def __contains__( self, key ):
+        return key in self._kinds
+
+    def __getitem__( self, key ):
+        if key not in self._items:
+            kind = self._kinds[ key ]
+            path = self.group + '/' + key
+            if kind == 'group':
+                val = LazyGroup( self.filename, path )
+            elif kind == 'array':
+                val = LazyArray( self.filename, path )
+            elif kind == 'attr':
+                with h5py.File( self.filename, 'r' ) as f:
+                    val = f[ self.group or '/' ].attrs[ key ]
+                if isinstance( val, ( bytes, np.bytes_ ) ):
+                    val = val.decode( 'utf-8' )
+            else:
+                with h5py.File( self.filename, 'r' ) as f:
+                    val = f[ path ][()]
+                if isinstance( val, bytes ):
+                    val = val.decode( 'utf-8' )
+            self._items[ key ] = val
+        return self._items[ key ]
+
+    def get( self, key, default=None ):
+        return self[ key ] if key in self._kinds else default
+
+    def items( self ):
+        return ( ( key, self[ key ] ) for key in self._kinds )
+
+    def values( self ):
+        return ( self[ key ] for key in self._kinds )
+
+    def __repr__( self ):
+        return '<LazyGroup %s:%s keys=%s>' % ( self.filename, self.group, list( self._kinds ) )
@@ -1,32 +1,57 @@
-from math import atan2, degrees
 import warnings
 import numpy as np
-import matplotlib.pyplot as plt
 
-from matplotlib.dates import date2num, DateConverter, num2date
-from matplotlib.container import ErrorbarContainer
 from datetime import datetime
+from lazy_import import LazyModule
+from mpl_decimate import minmax_indices
 
+mdates = LazyModule( 'matplotlib.dates' )
+mcontainer = LazyModule( 'matplotlib.container' )
 
-# Label line with line2D label data
-def labelLine(line, x, label=None, align=True, drop_label=False, **kwargs):
-    '''Label a single matplotlib line at position x
 
-    Parameters
-    ----------
-    line : matplotlib.lines.Line
-       The line holding the label
-    x : number
-       The location in data unit of the label
-    label : string, optional
-       The label to set. This is inferred from the line by default
-    drop_label : bool, optional
-       If True, the label is consumed by the function so that subsequent calls to e.g. legend
-       do not use it anymore.
-    kwargs : dict, optional
-       Optional arguments passed to ax.text
-    '''
-    ax = line.axes
+def x_to_float(x):
+    """Make sure datetime values are properly converted to floats."""
+    return mdates.date2num(x) if isinstance(x, datetime) else x
+
+
+def _xdata_to_float(xdata):
+    """Float view of the x data of a line, converting datetimes if needed."""
+    xdata = np.asarray(xdata)
+    if xdata.dtype == object or np.issubdtype(xdata.dtype, np.datetime64):
+        return np.asarray(mdates.date2num(xdata), dtype=float)
+    return xdata
+
+
+def find_segment(xdata, x):
+    """Index i of the first segment [xdata[i], xdata[i+1]] containing x, or None.
+
+    Monotonic data (increasing or decreasing) is searched with np.searchsorted,
+    other data with a vectorized interval mask over all segments.
+    """
+    xd = _xdata_to_float(xdata)
+    xf = x_to_float(x)
+    if xd.size < 2:
+        return None
+
+    dx = np.diff(xd)
+    if np.all(dx >= 0):
+        if not xd[0] <= xf <= xd[-1]:
+            return None
+        return max(int(np.searchsorted(xd, xf, side='left')) - 1, 0)
+    if np.all(dx <= 0):
+        if not xd[-1] <= xf <= xd[0]:
+            return None
+        return max(int(np.searchsorted(-xd, -xf, side='left')) - 1, 0)
+
+    xa, xb = xd[:-1], xd[1:]
+    inside = (np.minimum(xa, xb) <= xf) & (xf <= np.maximum(xa, xb))
+    if not inside.any():
+        return None
+    return int(np.argmax(inside))
+
+
+def _label_segment(line, x):
+    """Segment ends (xfa, ya, xfb, yb) and label y of line at x, or None if not finite."""
     xdata = line.get_xdata()
     ydata = line.get_ydata()
 
@@ -40,15 +65,10 @@ def labelLine(line, x, label=None, align=True, drop_label=False, **kwargs):
         xa = min(xdata)
         xb = max(xdata)
     else:
-        for i, (xa, xb) in enumerate(zip(xdata[:-1], xdata[1:])):
-            if min(xa, xb) <= x <= max(xa, xb):
-                break
-        else:
+        i = find_segment(xdata, x)
+        if i is None:
             raise Exception('x label location is outside data range!')
-
-    def x_to_float(x):
-        """Make sure datetime values are properly converted to floats."""
-        return date2num(x) if isinstance(x, datetime) else x
+        xa, xb = xdata[i], xdata[i + 1]
 
     xfa = x_to_float(xa)
     xfb = x_to_float(xb)
@@ -60,7 +80,19 @@ def labelLine(line, x, label=None, align=True, drop_label=False, **kwargs):
         warnings.warn(("%s could not be annotated due to `nans` values. "
                        "Consider using another location via the `x` argument.") % line,
                       UserWarning)
-        return
+        return None
+
+    return xfa, ya, xfb, yb, y
+
+
+def _rotation(screen_a, screen_b):
+    """Label rotations in degrees from segment ends in display coordinates."""
+    screen_d = np.asarray(screen_a) - np.asarray(screen_b)
+    return (np.degrees(np.arctan2(screen_d[..., 1], screen_d[..., 0])) + 90) % 180 - 90
+
+
+def _place_label(line, x, y, label, rotation, drop_label, kwargs):
+    ax = line.axes
 
     if not label:
         label = line.get_label()
@@ -68,13 +100,6 @@ def labelLine(line, x, label=None, align=True, drop_label=False, **kwargs):
     if drop_label:
         line.set_label(None)
 
-    if align:
-        # Compute the slope and label rotation
-        screen_dx, screen_dy = ax.transData.transform((xfa, ya)) - ax.transData.transform((xfb, yb))
-        rotation = (degrees(atan2(screen_dy, screen_dx)) + 90) % 180 - 90
-    else:
-        rotation = 0
-
     # Set a bunch of keyword arguments
     if 'color' not in kwargs:
         kwargs['color'] = line.get_color()
@@ -100,6 +125,199 @@ def labelLine(line, x, label=None, align=True, drop_label=False, **kwargs):
                           alpha=0.93) )
 
 
+def _occupied_cells(xy, x0, y0, cell, nx, ny):
+    """Unique grid cells crossed by a curve given by its (P, 2) display points.
+
+    Segments longer than half a cell are subdivided so that the curve does not
+    skip cells; dense curves are reduced to the cells they occupy.
+    """
+    xy = xy[np.all(np.isfinite(xy), axis=1)]
+    if len(xy) > 1:
+        n = np.ceil(np.hypot(*np.diff(xy, axis=0).T) / (0.5 * cell)).astype(np.int64)
+        long = np.flatnonzero(n > 1)
+        if long.size:
+            n = np.minimum(n[long], 1000)
+            seg = np.repeat(long, n)
+            t = np.arange(n.sum()) - np.repeat(np.cumsum(n) - n, n)
+            t = (t / np.repeat(n, n))[:, None]
+            xy = np.vstack((xy, xy[seg] * (1 - t) + xy[seg + 1] * t))
+    ix = np.floor((xy[:, 0] - x0) / cell).astype(np.int64)
+    iy = np.floor((xy[:, 1] - y0) / cell).astype(np.int64)
+    inside = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+    return np.flatnonzero(np.bincount(ix[inside] * ny + iy[inside], minlength=nx * ny))
+
+
+def optimize_xvals(lines, labels, n_candidates=40, fontsize=7, weights=None):
+    '''Label positions that avoid other curves, steep segments and other labels.
+
+    Parameters
+    ----------
+    lines : list of matplotlib lines
+       The lines to label, all in the same axes
+    labels : list of str
+       The label of each line, used to estimate the label box
+    n_candidates : int, optional
+       Candidate positions per line, taken at data points inside the axes
+    fontsize : float, optional
+       Font size of the labels, used to estimate the label box
+    weights : dict, optional
+       Weights of the 'overlap', 'slope' and 'labels' terms of the cost
+
+    The spatial index is a grid of cells of one label height holding the
+    lines that cross each cell, built from the min/max envelope of every line
+    (mpl_decimate.minmax_indices), so the overlap of a candidate box with the
+    other curves is a lookup of a few cells and the cost does not grow with
+    the number of samples beyond one pass over them. Candidates and slopes
+    are taken from a strided subset of the samples. Label boxes
+    are estimated from the font size and the number of characters, without
+    calling the renderer. Labels are then assigned greedily, cheapest first,
+    penalising candidates whose box overlaps the labels already placed.
+    Lines without any valid candidate get None.
+    '''
+    if not lines:
+        return []
+
+    w = {'overlap': 1.0, 'slope': 2.0, 'labels': 20.0}
+    w.update(weights or {})
+
+    ax = lines[0].axes
+    ax.get_xlim(), ax.get_ylim()  # apply any pending autoscaling to transData
+    n_lines = len(lines)
+    bbox = ax.bbox
+    dpi = ax.figure.dpi
+
+    # Label box half sizes in pixels (unrotated)
+    height = 1.2 * fontsize * dpi / 72
+    half_w = np.array([0.3 * fontsize * dpi / 72 * max(len(str(lab)), 1) for lab in labels])
+    half_h = 0.5 * height
+
+    # Grid of the spatial index
+    nx = int(np.ceil(bbox.width / height)) + 1
+    ny = int(np.ceil(bbox.height / height)) + 1
+    n_cells = nx * ny
+
+    # Candidates: (L, C) data x, display position and slope; occupied cells of every line
+    cand_x = np.full((n_lines, n_candidates), np.nan)
+    cand_xy = np.full((n_lines, n_candidates, 2), np.nan)
+    cand_d = np.zeros((n_lines, n_candidates, 2))
+    own_keys = []
+    for k, line in enumerate(lines):
+        xd = _xdata_to_float(line.get_xdata())
+        yd = np.asarray(line.get_ydata(), dtype=float)
+
+        # Min/max envelope of the samples, a few per pixel column, for the index
+        env = minmax_indices(yd, max(int(2 * bbox.width), 16))
+        xy = ax.transData.transform(np.column_stack((xd[env], yd[env])))
+        own_keys.append(k * n_cells + _occupied_cells(xy, bbox.x0, bbox.y0, height, nx, ny))
+
+        stride = max(len(yd) // (8 * n_candidates), 1)
+        xd = xd[::stride]
+        xy = ax.transData.transform(np.column_stack((xd, yd[::stride])))
+        ok = np.all(np.isfinite(xy), axis=1)
+        ok[1:-1] &= ok[:-2] & ok[2:]
+        ok[[0, -1]] = False
+        ok &= (xy[:, 0] >= bbox.x0) & (xy[:, 0] <= bbox.x1) & (xy[:, 1] >= bbox.y0) & (xy[:, 1] <= bbox.y1)
+        idx = np.flatnonzero(ok)
+        if idx.size == 0:
+            continue
+        idx = idx[np.unique(np.linspace(0, idx.size - 1, n_candidates + 2).round().astype(int)[1:-1])]
+        m = idx.size
+        cand_x[k, :m] = xd[idx]
+        cand_xy[k, :m] = xy[idx]
+        cand_d[k, :m] = xy[idx + 1] - xy[idx - 1]
+
+    # Lines crossing every cell, and the cells of each line, as sorted keys line*n_cells+cell
+    own_keys = np.concatenate(own_keys)
+    total = np.bincount(own_keys % n_cells, minlength=n_cells)
+
+    def count(line, cells):
+        # Other curves crossing the given cells
+        if own_keys.size == 0:
+            return np.zeros(cells.shape, dtype=np.int64)
+        keys = line * n_cells + cells
+        j = np.minimum(np.searchsorted(own_keys, keys), own_keys.size - 1)
+        return total[cells] - (own_keys[j] == keys)
+
+    # Rotated label extents along the curve
+    ang = np.arctan2(cand_d[..., 1], cand_d[..., 0])
+    c, s = np.abs(np.cos(ang)), np.abs(np.sin(ang))
+    ext_x = half_w[:, None] * c + half_h * s
+    ext_y = half_w[:, None] * s + half_h * c
+
+    valid = np.isfinite(cand_x)
+    valid &= (cand_xy[..., 0] - ext_x >= bbox.x0) & (cand_xy[..., 0] + ext_x <= bbox.x1)
+    valid &= (cand_xy[..., 1] - ext_y >= bbox.y0) & (cand_xy[..., 1] + ext_y <= bbox.y1)
+
+    # Overlap: other curves crossing the cells covered by each candidate box
+    overlap = np.zeros((n_lines, n_candidates))
+    lines_idx = np.broadcast_to(np.arange(n_lines)[:, None], overlap.shape)
+    cx = np.where(valid, cand_xy[..., 0] - bbox.x0, 0) / height
+    cy = np.where(valid, cand_xy[..., 1] - bbox.y0, 0) / height
+    rx = np.where(valid, ext_x, 0) / height
+    ry = np.where(valid, ext_y, 0) / height
+    x0, x1 = np.floor(cx - rx).astype(np.int64), np.floor(cx + rx).astype(np.int64)
+    y0, y1 = np.floor(cy - ry).astype(np.int64), np.floor(cy + ry).astype(np.int64)
+    for dx in range(int((x1 - x0).max(initial=0)) + 1):
+        for dy in range(int((y1 - y0).max(initial=0)) + 1):
+            jx, jy = x0 + dx, y0 + dy
+            hit = valid & (jx <= x1) & (jy <= y1)
+            hit &= (jx >= 0) & (jx < nx) & (jy >= 0) & (jy < ny)
+            overlap[hit] += count(lines_idx[hit], jx[hit] * ny + jy[hit])
+
+    slope = s
+    cost = w['overlap'] * overlap / max(overlap.max(initial=0), 1) + w['slope'] * slope
+    cost = np.where(valid, cost, np.inf)
+
+    # Greedy assignment, cheapest line first
+    xvals = [None] * n_lines
+    todo = np.isfinite(cost).any(axis=1)
+    while todo.any():
+        best = np.where(todo[:, None], cost, np.inf)
+        k, j = np.unravel_index(np.argmin(best), best.shape)
+        xvals[k] = cand_x[k, j]
+        todo[k] = False
+
+        # Penalise the candidates whose box overlaps the new label
+        ox = np.clip(1 - np.abs(cand_xy[..., 0] - cand_xy[k, j, 0]) / (ext_x + ext_x[k, j]), 0, 1)
+        oy = np.clip(1 - np.abs(cand_xy[..., 1] - cand_xy[k, j, 1]) / (ext_y + ext_y[k, j]), 0, 1)
+        cost = cost + w['labels'] * np.nan_to_num(ox * oy)
+
+    return xvals
+
+
+# Label line with line2D label data
+def labelLine(line, x, label=None, align=True, drop_label=False, **kwargs):
+    '''Label a single matplotlib line at position x
+
+    Parameters
+    ----------
+    line : matplotlib.lines.Line
+       The line holding the label
+    x : number
+       The location in data unit of the label
+    label : string, optional
+       The label to set. This is inferred from the line by default
+    drop_label : bool, optional
+       If True, the label is consumed by the function so that subsequent calls to e.g. legend
+       do not use it anymore.
+    kwargs : dict, optional
+       Optional arguments passed to ax.text
+    '''
+    seg = _label_segment(line, x)
+    if seg is None:
+        return
+    xfa, ya, xfb, yb, y = seg
+
+    if align:
+        # Compute the slope and label rotation
+        trans = line.axes.transData.transform
+        rotation = float(_rotation(trans((xfa, ya)), trans((xfb, yb))))
+    else:
+        rotation = 0
+
+    _place_label(line, x, y, label, rotation, drop_label, kwargs)
+
+
 def labelLines(lines, align=True, xvals=None, drop_label=False, **kwargs):
     '''Label all lines with their respective legends.
 
@@ -110,9 +328,10 @@ def labelLines(lines, align=True, xvals=None, drop_label=False, **kwargs):
     align : boolean, optional
        If True, the label will be aligned with the slope of the line
        at the location of the label. If False, they will be horizontal.
-    xvals : (xfirst, xlast) or array of float, optional
+    xvals : (xfirst, xlast) or array of float or 'auto', optional
        The location of the labels. If a tuple, the labels will be
        evenly spaced between xfirst and xlast (in the axis units).
+       If 'auto', the locations are chosen by optimize_xvals.
     drop_label : bool, optional
        If True, the label is consumed by the function so that subsequent calls to e.g. legend
        do not use it anymore.
@@ -126,19 +345,25 @@ def labelLines(lines, align=True, xvals=None, drop_label=False, **kwargs):
 
     all_lines = []
     for h in handles:
-        if isinstance(h, ErrorbarContainer):
+        if isinstance(h, mcontainer.ErrorbarContainer):
             all_lines.append(h.lines[0])
         else:
             all_lines.append(h)
 
     # Take only the lines which have labels other than the default ones
+    label_of = dict(zip(all_lines, allLabels))
     for line in lines:
-        if line in all_lines:
-            label = allLabels[all_lines.index(line)]
+        if line in label_of:
             labLines.append(line)
-            labels.append(label)
+            labels.append(label_of[line])
 
-    if xvals is None:
+    if isinstance(xvals, str) and xvals == 'auto':
+        xvals = optimize_xvals(labLines, labels)
+        keep = [i for i, x in enumerate(xvals) if x is not None]
+        labLines = [labLines[i] for i in keep]
+        labels = [labels[i] for i in keep]
+        xvals = [xvals[i] for i in keep]
+    elif xvals is None:
         xvals = ax.get_xlim()  # set axis limits as annotation limits, xvals now a tuple
     if type(xvals) == tuple:
         xmin, xmax = xvals
@@ -148,10 +373,26 @@ def labelLines(lines, align=True, xvals=None, drop_label=False, **kwargs):
         else:
             xvals = np.linspace(xmin, xmax, len(labLines)+2)[1:-1]
 
-        if isinstance(ax.xaxis.converter, DateConverter):
+        if isinstance(ax.xaxis.converter, mdates.DateConverter):
             # Convert float values back to datetime in case of datetime axis
-            xvals = [num2date(x).replace(tzinfo=ax.xaxis.get_units())
+            xvals = [mdates.num2date(x).replace(tzinfo=ax.xaxis.get_units())
                      for x in xvals]
 
+    # Segments of all labels first, then one transform for all the rotations
+    placed = []
     for line, x, label in zip(labLines, xvals, labels):
-        labelLine(line, x, label, align, drop_label, **kwargs)
+        seg = _label_segment(line, x)
+        if seg is not None:
+            placed.append((line, x, label, seg))
+    if not placed:
+        return
+
+    if align:
+        ends = np.array([(xfa, ya, xfb, yb) for (_, _, _, (xfa, ya, xfb, yb, _)) in placed], dtype=float)
+        screen = ax.transData.transform(ends.reshape(-1, 2)).reshape(-1, 2, 2)
+        rotations = _rotation(screen[:, 0], screen[:, 1])
+    else:
+        rotations = np.zeros(len(placed))
+
+    for (line, x, label, seg), rotation in zip(placed, rotations):
+        _place_label(line, x, seg[-1], label, float(rotation), drop_label, dict(kwargs))
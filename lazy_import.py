@@ -0,0 +1,22 @@
+import importlib
+
+
+class LazyModule:
+    '''Stand-in for a module that is imported on first attribute access.
+
+    h5py = LazyModule( 'h5py' )   # costs nothing at import time
+    h5py.File( ... )              # imports h5py here, once
+    '''
+
+    def __init__( self, name ):
+        self._name = name
+        self._module = None
+
+    def __getattr__( self, attr ):
+        if self._module is None:
+            self._module = importlib.import_module( self._name )
+        return getattr( self._module, attr )
+
+    def __repr__( self ):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return '<LazyModule %s (%s)>' % ( self._name, state )
@@ -6,7 +6,10 @@
 #
 # Adapted from: https://www.advanpix.com/documentation/users-manual/#gauss
 
-import sympy as sp
+from lazy_import import LazyModule
+
+sp = LazyModule( 'sympy' )
+mp = LazyModule( 'mpmath' )
 
 def GaussLegendre_PW( ctx, N ):
 
@@ -0,0 +1,103 @@
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+#~==============================================================================
+# Batch rendering of figures in a process pool
+#
+# Each job is drawn and saved in a worker process that switched to the Agg
+# backend and applied mpl_utils.config_plots once at startup. Jobs must be
+# picklable: func is a module level function called as func( fig, *args,
+# **kwargs ) on a new figure, and the arguments are plain data.
+#~==============================================================================
+
+PlotJob = namedtuple( 'PlotJob', 'func filename args kwargs formats savefig_kwargs' )
+PlotJob.__new__.__defaults__ = ( (), None, ( 'pdf', ), None )
+PlotJob.__doc__ = '''Figure to render: func( fig, *args, **kwargs ), saved as
+filename.<fmt> for every fmt of formats (filename is required).'''
+
+def _init_worker( config ):
+    import matplotlib
+    matplotlib.use( 'Agg' )
+    import mpl_utils
+    mpl_utils.config_plots( **config )
+
+def _render( job ):
+#
+#   Draws and saves one job; returns the files written and the timings (s).
+#
+    import matplotlib.pyplot as plt
+
+    if job.filename is None:
+        raise Exception( 'PlotJob of %s has no filename!' % getattr( job.func, '__name__', job.func ) )
+
+    t0 = time.perf_counter()
+    fig = plt.figure()
+    try:
+        job.func( fig, *job.args, **( job.kwargs or {} ) )
+        t1 = time.perf_counter()
+        files = []
+        for fmt in job.formats:
+            fname = '%s.%s' % ( job.filename, fmt )
+            fig.savefig( fname, format=fmt, **( job.savefig_kwargs or {} ) )
+            files.append( fname )
+        t2 = time.perf_counter()
+    finally:
+        plt.close( fig )
+
+    return { 'files': files, 'plot': t1 - t0, 'save': t2 - t1, 'total': t2 - t0, 'pid': os.getpid() }
+
+def render_figures( jobs, n_workers=None, config=None ):
+#
+#   Renders the list of PlotJob and returns one timing dict per job, in the
+#   order of the jobs.
+#
+#   n_workers:
+#       processes used (1 = serial, in this process; note that the serial
+#       path also switches this process to Agg and applies config_plots).
+#   config:
+#       keyword arguments of mpl_utils.config_plots.
+#
+    jobs = list( jobs )
+    config = config or {}
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = max( 1, min( n_workers, len( jobs ) ) )
+
+    if n_workers == 1:
+        _init_worker( config )
+        return [ _render( job ) for job in jobs ]
+
+    with ProcessPoolExecutor( n_workers, initializer=_init_worker, initargs=( config, ) ) as pool:
+        return list( pool.map( _render, jobs ) )
+
+#~==============================================================================
+def _bench_plot( fig, k, n ):
+    import numpy as np
+    ax = fig.add_subplot( 111 )
+    x = np.linspace( 0.0, 10.0, n )
+    for i in range( 8 ):
+        ax.plot( x, np.sin( x + 0.3 * ( i + k ) ) * np.exp( -0.1 * i * x ), label='$\\alpha_{%d}$' % i )
+    ax.set_xlabel( '$t$ [s]' )
+    ax.set_ylabel( '$y$ [m]' )
+    ax.legend( loc='upper right' )
+    ax.grid( True )
+
+
+if __name__ == '__main__':
+
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        jobs = [ PlotJob( _bench_plot, os.path.join( tmp, 'fig%03d' % k ), ( k, 5000 ),
+                          formats=( 'pdf', 'png' ) ) for k in range( 16 ) ]
+
+        for n_workers in ( os.cpu_count() or 1, 1 ):
+            t0 = time.perf_counter()
+            timings = render_figures( jobs, n_workers )
+            wall = time.perf_counter() - t0
+            cpu = sum( t[ 'total' ] for t in timings )
+            print( f'workers={n_workers:3d}  figures={len( jobs )}  wall {wall:6.2f} s  '
+                   f'sum per figure {cpu:6.2f} s  mean {cpu / len( jobs ) * 1e3:7.1f} ms' )
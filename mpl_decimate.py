@@ -0,0 +1,159 @@
+import numpy as np
+
+#~==============================================================================
+# Decimation of long series before plotting
+#
+# A line of 10^7 samples drawn in a 6 in figure shows at most a few thousand
+# pixel columns. plot_decimated draws a reduced copy of the data sized to the
+# width of the axes in pixels, and recomputes it from the full data whenever
+# the x limits change (zoom and pan in interactive backends).
+#
+# Two reductions are available:
+#   'minmax' keeps the first, min, max and last samples of every pixel column,
+#            so the envelope of the curve is exact;
+#   'lttb'   Largest-Triangle-Three-Buckets, one sample per bucket chosen to
+#            keep the visual shape, for smoother curves.
+#
+# The reduced data is the data of the Line2D, so labelLine/labelLines and
+# inline_label( lbl, line.get_xdata(), line.get_ydata(), i ) place labels on
+# the curve as drawn.
+#~==============================================================================
+
+def _nan_extrema( y, axis=-1 ):
+#
+#   argmin and argmax along axis, ignoring nans (all-nan slices give index 0).
+#
+    bad = np.isnan( y )
+    i_min = np.argmin( np.where( bad, np.inf, y ), axis=axis )
+    i_max = np.argmax( np.where( bad, -np.inf, y ), axis=axis )
+    return i_min, i_max
+
+def minmax_indices( y, n_bins ):
+#
+#   Indices of the first, min, max and last samples of n_bins bins of equal
+#   sample count, in increasing order.
+#
+    n = y.size
+    if n <= 4 * n_bins:
+        return np.arange( n )
+
+    size = n // n_bins
+    m = size * n_bins
+    i_min, i_max = _nan_extrema( y[:m].reshape( n_bins, size ), axis=1 )
+    start = np.arange( n_bins ) * size
+    idx = np.concatenate( ( start, start + size - 1, start + i_min, start + i_max ) )
+
+    if m < n:
+        j_min, j_max = _nan_extrema( y[m:] )
+        idx = np.concatenate( ( idx, [ m, n - 1, m + j_min, m + j_max ] ) )
+    return np.unique( idx )
+
+def lttb_indices( x, y, n_out ):
+#
+#   Largest-Triangle-Three-Buckets: indices of n_out samples, keeping the first
+#   and the last. Each bucket keeps the sample forming the largest triangle
+#   with the sample kept in the previous bucket and the mean of the next one.
+#
+    n = y.size
+    if n_out >= n or n_out < 3:
+        return np.arange( n )
+
+    edges = np.linspace( 1, n - 1, n_out - 1 ).astype( np.int64 )
+    x = np.asarray( x, dtype=float )
+    y = np.nan_to_num( np.asarray( y, dtype=float ) )
+
+    # Bucket means, computed at once with cumulative sums
+    cx = np.concatenate( ( [ 0.0 ], np.cumsum( x ) ) )
+    cy = np.concatenate( ( [ 0.0 ], np.cumsum( y ) ) )
+    lo, hi = edges[:-1], edges[1:]
+    cnt = np.maximum( hi - lo, 1 )
+    mean_x = ( cx[hi] - cx[lo] ) / cnt
+    mean_y = ( cy[hi] - cy[lo] ) / cnt
+    mean_x = np.append( mean_x, x[-1] )
+    mean_y = np.append( mean_y, y[-1] )
+
+    idx = np.empty( n_out, dtype=np.int64 )
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for b in range( n_out - 2 ):
+        s = slice( lo[b], max( hi[b], lo[b] + 1 ) )
+        area = np.abs( ( x[a] - mean_x[b+1] ) * ( y[s] - y[a] )
+                     - ( x[a] - x[s] ) * ( mean_y[b+1] - y[a] ) )
+        a = s.start + int( np.argmax( area ) )
+        idx[b+1] = a
+    return idx
+
+def decimate( x, y, n_pixels, method='minmax', xlim=None ):
+#
+#   Reduced (x, y) of a series with increasing x for n_pixels pixel columns,
+#   restricted to xlim plus one sample on each side so the line reaches the
+#   edges of the axes.
+#
+    x = np.asarray( x )
+    y = np.asarray( y )
+    i0, i1 = 0, x.size
+    if xlim is not None:
+        i0 = max( int( np.searchsorted( x, min( xlim ), side='left' ) ) - 1, 0 )
+        i1 = min( int( np.searchsorted( x, max( xlim ), side='right' ) ) + 1, x.size )
+    xs, ys = x[i0:i1], y[i0:i1]
+
+    n_pixels = max( int( n_pixels ), 1 )
+    if method == 'minmax':
+        idx = minmax_indices( ys, n_pixels )
+    elif method == 'lttb':
+        idx = lttb_indices( xs, ys, 2 * n_pixels )
+    else:
+        raise Exception( 'Unknown decimation method %s!' % method )
+    return xs[idx], ys[idx]
+
+
+class DecimatedLine:
+    '''Keeps the full data of a Line2D and refreshes its reduced data.
+
+    Parameters
+    ----------
+    line : matplotlib.lines.Line2D
+       Line drawn with the reduced data.
+    x, y : ndarray
+       Full data, x increasing.
+    method : str, optional
+       'minmax' or 'lttb'.
+    oversample : float, optional
+       Pixel columns per screen pixel of the axes width.
+
+    Created by plot_decimated, which stores it as line.decimator.
+    '''
+
+    def __init__( self, line, x, y, method='minmax', oversample=1.0 ):
+        self.line = line
+        self.x = np.asarray( x )
+        self.y = np.asarray( y )
+        self.method = method
+        self.oversample = oversample
+        self.ax = line.axes
+        self._cid = self.ax.callbacks.connect( 'xlim_changed', self.update )
+
+    def n_pixels( self ):
+        return max( int( self.oversample * self.ax.bbox.width ), 16 )
+
+    def update( self, ax=None ):
+        self.line.set_data( *decimate( self.x, self.y, self.n_pixels(), self.method, self.ax.get_xlim() ) )
+        self.ax.figure.canvas.draw_idle()
+
+    def disconnect( self ):
+        self.ax.callbacks.disconnect( self._cid )
+
+
+def plot_decimated( ax, x, y, *args, method='minmax', oversample=1.0, **kwargs ):
+#
+#   ax.plot of the reduced data of (x, y); extra arguments are passed to
+#   ax.plot. Returns the Line2D, with the full data in line.decimator.
+#   Full-resolution data with fewer samples than pixel columns is drawn as is.
+#
+    x = np.asarray( x )
+    y = np.asarray( y )
+    n_pixels = max( int( oversample * ax.bbox.width ), 16 )
+    xd, yd = decimate( x, y, n_pixels, method )
+    line, = ax.plot( xd, yd, *args, **kwargs )
+    line.decimator = DecimatedLine( line, x, y, method, oversample )
+    return line
@@ -1,7 +1,8 @@
-import matplotlib.pyplot as mpl
 import numpy as np
-from cycler import cycler
 import os
+from lazy_import import LazyModule
+
+mpl = LazyModule( 'matplotlib.pyplot' )
 
 linestyles = (  (  6, 0 ), 
                 (  6, 2 ), 
@@ -56,6 +57,8 @@ def config_plots( font_sans_serif=False, dpi=None ):
     if dpi != None:    
       mpl.rcParams["figure.dpi"] = dpi
 
+    from cycler import cycler
+
     ls = ( (0,l) for l in linestyles )
     dc = ( cycler( linestyle = ls ) + cycler('color', linecolors ) )    
     
@@ -0,0 +1,106 @@
+import numpy as np
+from lazy_import import LazyModule
+
+h5py = LazyModule( 'h5py' )
+
+#~==============================================================================
+# Frequency dependent hydrodynamic coefficients of the OWC
+#
+# The 'hydro' group of PICO_OWC_Coeffs.h5 holds pairs of datasets
+#   <name>_frq_vec, <name>_amp_vec
+# (e.g. G, H, 𝚪), each pair with its own frequency axis. The store loads them
+# once and precomputes the interpolation coefficients per interval, so that a
+# query is a searchsorted plus a polynomial evaluation over the whole array of
+# frequencies, with no I/O and no Python loop.
+#~==============================================================================
+
+def _natural_spline_coeffs( x, y ):
+#
+#   Coefficients (4, n-1) of the natural cubic spline through (x, y), with
+#   s(t) = c0 + c1 dt + c2 dt^2 + c3 dt^3 on [x_i, x_i+1], dt = t - x_i.
+#
+    n = x.size
+    h = np.diff( x )
+    A = np.zeros( ( n, n ) )
+    r = np.zeros( n )
+    A[0,0] = A[-1,-1] = 1.0
+    for i in range( 1, n-1 ):
+        A[i,i-1:i+2] = ( h[i-1], 2.0 * ( h[i-1] + h[i] ), h[i] )
+        r[i] = 6.0 * ( ( y[i+1] - y[i] ) / h[i] - ( y[i] - y[i-1] ) / h[i-1] )
+    M = np.linalg.solve( A, r )
+
+    c0 = y[:-1]
+    c1 = ( y[1:] - y[:-1] ) / h - h * ( 2.0 * M[:-1] + M[1:] ) / 6.0
+    c2 = 0.5 * M[:-1]
+    c3 = ( M[1:] - M[:-1] ) / ( 6.0 * h )
+    return np.ascontiguousarray( np.stack( ( c0, c1, c2, c3 ) ) )
+
+
+class HydroCoeffs:
+    '''Vectorized interpolation of the hydrodynamic coefficients.
+
+    Parameters
+    ----------
+    filename : str, optional
+       Coefficient file.
+    group : str, optional
+       Group with the <name>_frq_vec / <name>_amp_vec pairs.
+    kind : str, optional
+       'linear' or 'cubic' (natural spline).
+    fill_value : float or None, optional
+       Value outside the tabulated frequency range; None holds the end values.
+
+    Usage
+    -----
+    coeffs = HydroCoeffs()
+    G = coeffs( 'G', omega )        # omega: array of any shape
+    all = coeffs.values( omega )    # (n_coeffs,) + omega.shape, in coeffs.names order
+    '''
+
+    def __init__( self, filename='PICO_OWC_Coeffs.h5', group='hydro', kind='linear', fill_value=None ):
+        if kind not in ( 'linear', 'cubic' ):
+            raise Exception( 'Unknown interpolation kind %s!' % kind )
+        self.kind = kind
+        self.fill_value = fill_value
+
+        with h5py.File( filename, 'r' ) as f:
+            grp = f[ group ]
+            self.names = sorted( k[:-len( '_frq_vec' )] for k in grp if k.endswith( '_frq_vec' ) )
+            self.freqs, self.amps = {}, {}
+            for name in self.names:
+                frq = np.asarray( grp[ name + '_frq_vec' ][()], dtype=float )
+                amp = np.asarray( grp[ name + '_amp_vec' ][()], dtype=float )
+                order = np.argsort( frq, kind='stable' )
+                self.freqs[ name ] = np.ascontiguousarray( frq[ order ] )
+                self.amps[ name ]  = np.ascontiguousarray( amp[ order ] )
+
+        self.coeffs = {}
+        for name in self.names:
+            x, y = self.freqs[ name ], self.amps[ name ]
+            if kind == 'linear':
+                self.coeffs[ name ] = np.stack( ( y[:-1], np.diff( y ) / np.diff( x ) ) )
+            else:
+                self.coeffs[ name ] = _natural_spline_coeffs( x, y )
+
+    def __call__( self, name, omega ):
+        x = self.freqs[ name ]
+        c = self.coeffs[ name ]
+        w = np.asarray( omega, dtype=float )
+
+        wc = np.clip( w, x[0], x[-1] )
+        i = np.clip( np.searchsorted( x, wc, side='right' ) - 1, 0, x.size - 2 )
+        dt = wc - x[i]
+
+        val = c[-1][i]
+        for k in range( c.shape[0] - 2, -1, -1 ):
+            val = val * dt + c[k][i]
+
+        if self.fill_value is not None:
+            val = np.where( ( w < x[0] ) | ( w > x[-1] ), self.fill_value, val )
+        return val
+
+    def values( self, omega ):
+        return np.stack( [ self( name, omega ) for name in self.names ] )
+
+    def range( self, name ):
+        return self.freqs[ name ][0], self.freqs[ name ][-1]